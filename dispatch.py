@@ -0,0 +1,181 @@
+"""
+Solar Panel Fault Detection - Fault Dispatch
+============================================
+Priority queue of open faults with workload-balanced auto-assignment
+
+Unassigned open faults wait in a heap ordered by severity, then efficiency
+loss (upper bound of the range), then detection time, so the worst and
+oldest faults are dispatched first. No-Anomaly records are never queued. Technicians sit in a second heap keyed
+by current workload. Both heaps use lazy invalidation: updates push a fresh
+entry and stale ones are discarded when they surface, so adding, closing,
+reassigning and dispatching a fault are all O(log n).
+"""
+
+from fault_catalog import TECHNICIANS, UNASSIGNED, HEALTHY_CLASS
+from datetime import datetime
+import itertools
+import heapq
+import re
+
+SEVERITY_RANK = {'Critical': 0, 'High': 1, 'Medium': 2, 'Low': 3}
+
+
+def loss_upper_bound(efficiency_loss):
+    """Upper bound of an efficiency loss string like '15-30%', as a float"""
+    numbers = re.findall(r'\d+(?:\.\d+)?', str(efficiency_loss))
+    return float(numbers[-1]) if numbers else 0.0
+
+
+def fault_priority(severity, efficiency_loss, detected):
+    """Sort key for a fault: lower sorts first"""
+    if isinstance(detected, str):
+        detected = datetime.strptime(detected, '%Y-%m-%d %H:%M')
+    return (SEVERITY_RANK.get(severity, len(SEVERITY_RANK)),
+            -loss_upper_bound(efficiency_loss),
+            detected.timestamp())
+
+
+class DispatchEngine:
+    """
+    Open-fault queue and technician workload tracker
+
+    Args:
+        technicians: Technician names that can receive faults
+        max_workload: Open faults a technician may hold before being skipped
+    """
+
+    def __init__(self, technicians=TECHNICIANS, max_workload=None):
+        self.max_workload = max_workload
+        self.workload = {name: 0 for name in technicians}
+        self._pending = {}      # fault_id -> heap token of its live queue entry
+        self._priority = {}     # fault_id -> priority of every open fault
+        self._assignee = {}     # fault_id -> technician for assigned open faults
+        self._queue = []        # (priority, token, fault_id)
+        self._techs = [(0, name) for name in technicians]
+        self._tokens = itertools.count()
+        heapq.heapify(self._techs)
+
+    def __len__(self):
+        return len(self._priority)
+
+    @property
+    def pending_count(self):
+        return len(self._pending)
+
+    def _push_tech(self, name):
+        heapq.heappush(self._techs, (self.workload[name], name))
+        # Keep stale entries from piling up under heavy churn
+        if len(self._techs) > 4 * len(self.workload) + 64:
+            self._techs = [(load, name) for name, load in self.workload.items()]
+            heapq.heapify(self._techs)
+
+    def _enqueue(self, fault_id):
+        token = next(self._tokens)
+        self._pending[fault_id] = token
+        heapq.heappush(self._queue, (self._priority[fault_id], token, fault_id))
+        if len(self._queue) > 2 * len(self._pending) + 64:
+            self._queue = [entry for entry in self._queue if self._pending.get(entry[2]) == entry[1]]
+            heapq.heapify(self._queue)
+
+    def _release(self, fault_id):
+        technician = self._assignee.pop(fault_id, None)
+        if technician in self.workload:
+            self.workload[technician] -= 1
+            self._push_tech(technician)
+        self._pending.pop(fault_id, None)
+
+    def add_fault(self, fault_id, severity, efficiency_loss, detected, assigned_to=None,
+                  fault_type=None):
+        """
+        Add or update an open fault
+
+        A No-Anomaly record needs no technician; it is closed instead of queued.
+
+        Args:
+            fault_id: Stable fault key (the panel ID)
+            severity: Fault severity
+            efficiency_loss: Efficiency loss range, e.g. '15-30%'
+            detected: Detection time (datetime or '%Y-%m-%d %H:%M')
+            assigned_to: Current technician, or None/'Unassigned' to queue it
+            fault_type: Fault class, used to leave healthy panels out
+        """
+        if fault_type == HEALTHY_CLASS:
+            self.close_fault(fault_id)
+            return
+        self._priority[fault_id] = fault_priority(severity, efficiency_loss, detected)
+        current = self._assignee.get(fault_id)
+
+        if assigned_to in self.workload:
+            if current != assigned_to:
+                self.assign(fault_id, assigned_to)
+        elif current is not None:
+            self.assign(fault_id, UNASSIGNED)
+        else:
+            # New or re-prioritised pending fault; any older heap entry goes stale
+            self._enqueue(fault_id)
+
+    def assign(self, fault_id, technician):
+        """Manually assign (or unassign with 'Unassigned') an open fault"""
+        if fault_id not in self._priority:
+            raise KeyError(f"Unknown open fault: {fault_id}")
+        self._release(fault_id)
+
+        if technician in (None, UNASSIGNED):
+            self._enqueue(fault_id)
+            return
+        if technician not in self.workload:
+            raise ValueError(f"Unknown technician: {technician}")
+        self._assignee[fault_id] = technician
+        self.workload[technician] += 1
+        self._push_tech(technician)
+
+    def close_fault(self, fault_id):
+        """Remove a completed fault and free its technician"""
+        if fault_id in self._priority:
+            self._release(fault_id)
+            del self._priority[fault_id]
+
+    def _least_loaded(self):
+        while self._techs:
+            load, name = self._techs[0]
+            if self.workload.get(name) != load:
+                heapq.heappop(self._techs)
+                continue
+            if self.max_workload is not None and load >= self.max_workload:
+                return None
+            return name
+        return None
+
+    def next_fault(self):
+        """Highest-priority unassigned fault, or None"""
+        while self._queue:
+            _, token, fault_id = self._queue[0]
+            if self._pending.get(fault_id) == token:
+                return fault_id
+            heapq.heappop(self._queue)
+        return None
+
+    def auto_assign(self, limit=None):
+        """
+        Assign pending faults, most urgent first, to the least-loaded technicians
+
+        Args:
+            limit: Maximum faults to assign in this call
+
+        Returns:
+            List of (fault_id, technician) assignments made
+        """
+        assignments = []
+        while limit is None or len(assignments) < limit:
+            fault_id = self.next_fault()
+            technician = self._least_loaded()
+            if fault_id is None or technician is None:
+                break
+            self.assign(fault_id, technician)
+            assignments.append((fault_id, technician))
+        return assignments
+
+    def pending(self, n=10):
+        """The n most urgent unassigned faults, without removing them"""
+        live = ((p, t, f) for p, t, f in self._queue if self._pending.get(f) == t)
+        return [fault_id for _, _, fault_id in heapq.nsmallest(n, live)]
@@ -0,0 +1,266 @@
+"""
+Solar Panel Fault Detection - Embedding Index
+=============================================
+Penultimate-layer embeddings and an on-disk approximate nearest-neighbour
+index for similar-fault search and near-duplicate detection
+
+Embeddings are the pooled features feeding the YOLOv8-cls linear head,
+captured with a forward hook so they come for free with normal inference.
+The index uses random-hyperplane LSH (several hash tables, single-bit
+multi-probe) to shortlist candidates, then ranks them by exact cosine
+similarity against the float16 vectors memory-mapped from disk.
+
+Layout of an index directory:
+    config.json   dimensions and hashing parameters
+    vectors.f16   L2-normalised float16 vectors, appended row by row
+    meta.jsonl    one JSON metadata record per vector
+    thumbnails/   JPEG thumbnails of images that have no file of their own
+"""
+
+from collections import deque
+from pathlib import Path
+import numpy as np
+import threading
+import hashlib
+import json
+
+DEFAULT_INDEX_DIR = Path('embeddings')
+THUMBNAIL_SIZE = 256
+
+
+def image_digest(data):
+    """Content hash of raw image bytes, used to recognise the same image"""
+    return hashlib.sha1(data).hexdigest()
+
+
+def save_thumbnail(image, digest, index_dir=DEFAULT_INDEX_DIR, size=THUMBNAIL_SIZE):
+    """
+    Store a thumbnail of a PIL image next to the index, named by its digest
+
+    Returns:
+        Path of the thumbnail (reused if the same image was saved before)
+    """
+    path = Path(index_dir) / 'thumbnails' / f"{digest}.jpg"
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        thumb = image.convert('RGB')
+        thumb.thumbnail((size, size))
+        thumb.save(path, quality=85)
+    return path
+
+
+def _classify_linear(model):
+    """Return the final linear layer of an ultralytics classification model"""
+    net = getattr(model, 'model', model)
+    head = net.model[-1]
+    if not hasattr(head, 'linear'):
+        raise ValueError("Model does not have a YOLOv8 classification head")
+    return head.linear
+
+
+class EmbeddingExtractor:
+    """
+    Capture penultimate-layer embeddings during normal inference
+
+    Every forward pass through the head is captured, so run one predict
+    before attaching the hook: the first predict call also runs the
+    predictor's warmup pass (on GPU), which would otherwise leave an extra
+    embedding at the front of the queue.
+
+    Usage:
+        model.predict(warmup_image)
+        with EmbeddingExtractor(model) as extractor:
+            for result in model.predict(source, stream=True):
+                embedding = extractor.pop()
+    """
+
+    def __init__(self, model):
+        self.layer = _classify_linear(model)
+        self._pending = deque()
+        self._handle = None
+
+    def _hook(self, module, inputs, output):
+        features = inputs[0].detach().float().cpu().numpy()
+        self._pending.extend(features)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def __enter__(self):
+        self._pending.clear()
+        self._handle = self.layer.register_forward_hook(self._hook)
+        return self
+
+    def __exit__(self, *exc):
+        self._handle.remove()
+        self._handle = None
+        self._pending.clear()
+        return False
+
+    def pop(self):
+        """Embedding of the oldest image not yet consumed, in result order"""
+        return self._pending.popleft()
+
+
+def _normalize(vectors):
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class EmbeddingIndex:
+    """
+    Append-only approximate nearest-neighbour index stored on disk
+
+    Args:
+        path: Index directory, created on first add
+        dim: Embedding size (required when creating a new index)
+        n_tables: Number of LSH hash tables
+        n_bits: Hyperplanes per table
+        seed: Seed for the hyperplanes, stored so reopening hashes identically
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_DIR, dim=None, n_tables=8, n_bits=14, seed=0):
+        self.path = Path(path)
+        config_file = self.path / 'config.json'
+        if config_file.exists():
+            with open(config_file) as f:
+                config = json.load(f)
+        else:
+            if dim is None:
+                raise ValueError(f"No index at {self.path}; pass dim to create one")
+            config = {'dim': dim, 'n_tables': n_tables, 'n_bits': n_bits, 'seed': seed}
+
+        self.config = config
+        self.dim = config['dim']
+        self.n_tables = config['n_tables']
+        self.n_bits = config['n_bits']
+        rng = np.random.default_rng(config['seed'])
+        self._planes = rng.standard_normal((self.n_tables, self.n_bits, self.dim)).astype(np.float32)
+        self._powers = 1 << np.arange(self.n_bits, dtype=np.int64)
+
+        self._lock = threading.Lock()
+        self._mmap = None
+        self._buckets = [dict() for _ in range(self.n_tables)]
+        self.metadata = []
+        self._load()
+
+    def __len__(self):
+        return len(self.metadata)
+
+    @property
+    def _vectors_file(self):
+        return self.path / 'vectors.f16'
+
+    @property
+    def _meta_file(self):
+        return self.path / 'meta.jsonl'
+
+    def _load(self):
+        if not self._meta_file.exists():
+            return
+        with open(self._meta_file) as f:
+            self.metadata = [json.loads(line) for line in f]
+
+        vectors = self._vectors()
+        for start in range(0, len(vectors), 65536):
+            chunk = np.asarray(vectors[start:start + 65536], dtype=np.float32)
+            self._insert_keys(self._hash(chunk), start)
+
+    def _vectors(self):
+        if self._mmap is None:
+            if not self._vectors_file.exists() or not self.metadata:
+                return np.empty((0, self.dim), dtype=np.float16)
+            self._mmap = np.memmap(self._vectors_file, dtype=np.float16, mode='r',
+                                   shape=(len(self.metadata), self.dim))
+        return self._mmap
+
+    def _hash(self, vectors):
+        """LSH keys, shape (n_vectors, n_tables)"""
+        projections = np.einsum('tbd,nd->ntb', self._planes, vectors)
+        return (projections > 0).astype(np.int64) @ self._powers
+
+    def _insert_keys(self, keys, start):
+        for offset, row in enumerate(keys):
+            for table, key in zip(self._buckets, row):
+                table.setdefault(int(key), []).append(start + offset)
+
+    def add(self, embeddings, metadata):
+        """
+        Append embeddings with one metadata dict each
+
+        Args:
+            embeddings: Array of shape (dim,) or (n, dim)
+            metadata: Dict or list of dicts (must be JSON-serializable)
+        """
+        vectors = _normalize(embeddings)
+        if isinstance(metadata, dict):
+            metadata = [metadata]
+        if len(metadata) != len(vectors):
+            raise ValueError("Need one metadata record per embedding")
+
+        with self._lock:
+            self.path.mkdir(parents=True, exist_ok=True)
+            config_file = self.path / 'config.json'
+            if not config_file.exists():
+                with open(config_file, 'w') as f:
+                    json.dump(self.config, f, indent=2)
+
+            start = len(self.metadata)
+            with open(self._vectors_file, 'ab') as f:
+                vectors.astype(np.float16).tofile(f)
+            with open(self._meta_file, 'a') as f:
+                for record in metadata:
+                    f.write(json.dumps(record) + '\n')
+
+            self.metadata.extend(metadata)
+            self._insert_keys(self._hash(vectors), start)
+            self._mmap = None
+        return start
+
+    def _candidates(self, key_row):
+        candidates = set()
+        for table, key in zip(self._buckets, key_row):
+            key = int(key)
+            candidates.update(table.get(key, ()))
+            # Multi-probe: neighbouring buckets one bit flip away
+            for bit in self._powers:
+                candidates.update(table.get(key ^ int(bit), ()))
+        return candidates
+
+    def query(self, embedding, k=5, min_similarity=None, exclude_digest=None):
+        """
+        Approximate nearest neighbours of one embedding
+
+        Args:
+            embedding: Query vector of shape (dim,)
+            k: Number of neighbours
+            min_similarity: Drop matches below this cosine similarity
+            exclude_digest: Skip entries of this image (see image_digest),
+                so a query image doesn't come back as its own best match
+
+        Returns:
+            List of (similarity, metadata) tuples, most similar first
+        """
+        vector = _normalize(embedding)
+        with self._lock:
+            candidates = self._candidates(self._hash(vector)[0])
+            if not candidates:
+                return []
+            ids = np.fromiter(candidates, dtype=np.int64)
+            ids.sort()
+            similarities = np.asarray(self._vectors()[ids], dtype=np.float32) @ vector[0]
+
+        matches = []
+        for i in np.argsort(-similarities):
+            if len(matches) == k or (min_similarity is not None and similarities[i] < min_similarity):
+                break
+            record = self.metadata[ids[i]]
+            if exclude_digest is not None and record.get('image_digest') == exclude_digest:
+                continue
+            matches.append((float(similarities[i]), record))
+        return matches
+
+    def is_duplicate(self, embedding, threshold=0.98):
+        """True if an indexed embedding is at least `threshold` cosine-similar"""
+        return bool(self.query(embedding, k=1, min_similarity=threshold))
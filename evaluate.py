@@ -5,20 +5,41 @@ Evaluates trained YOLOv8 model on test dataset
 """
 
 from ultralytics import YOLO
+from model_registry import resolve_model_path
+from instrumentation import timer, record_speed, observe_batch, inc, configure_from_env
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from pathlib import Path
+from PIL import Image
+import pandas as pd
+import numpy as np
+import argparse
+import time
+import glob
+import torch
 
-def evaluate_model(model_path='runs/classify/solar_fault_detection/weights/best.pt'):
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png')
+
+# Test split shared with worker processes (set by _init_worker)
+_shared_test_set = None
+
+def evaluate_model(model_path=None):
     """Evaluate the trained model on test set"""
     
+    model_path = model_path or resolve_model_path()
     print("🔍 Loading trained model...")
-    model = YOLO(model_path)
+    with timer('model_load'):
+        model = YOLO(model_path)
     
     print("📊 Evaluating on test set...")
-    metrics = model.val(
-        data='data/images',
-        split='test',
-        batch=32,
-        imgsz=224,
-    )
+    with timer('evaluate'):
+        metrics = model.val(
+            data='data/images',
+            split='test',
+            batch=32,
+            imgsz=224,
+        )
+    
+    record_speed(metrics.speed)
     
     print("\n✅ Evaluation Results:")
     print(f"   Top-1 Accuracy: {metrics.top1:.4f}")
@@ -26,9 +47,159 @@ def evaluate_model(model_path='runs/classify/solar_fault_detection/weights/best.
     
     return metrics
 
+def _decode(path, imgsz):
+    # Same geometry as ultralytics classify_transforms: square centre crop, then resize
+    with Image.open(path) as im:
+        im = im.convert('RGB')
+        w, h = im.size
+        side = min(w, h)
+        left, top = (w - side) // 2, (h - side) // 2
+        im = im.crop((left, top, left + side, top + side)).resize((imgsz, imgsz), Image.BILINEAR)
+        return np.asarray(im).transpose(2, 0, 1)
+
+def load_test_split(data_dir='data/images/test', imgsz=224, threads=8):
+    """
+    Decode the test split once into a shared uint8 tensor
+    
+    Args:
+        data_dir: Split directory with one sub-folder per class
+        imgsz: Square input size
+        threads: Decoder threads
+    
+    Returns:
+        (images [N, 3, imgsz, imgsz] uint8, labels [N] int64, class_names)
+    """
+    data_dir = Path(data_dir)
+    class_names = sorted(d.name for d in data_dir.iterdir() if d.is_dir())
+    paths, labels = [], []
+    for label, name in enumerate(class_names):
+        for path in sorted((data_dir / name).iterdir()):
+            if path.suffix.lower() in IMAGE_SUFFIXES:
+                paths.append(path)
+                labels.append(label)
+    
+    print(f"🗂️  Decoding {len(paths)} test images at {imgsz}px...")
+    images = torch.empty((len(paths), 3, imgsz, imgsz), dtype=torch.uint8)
+    with timer('decode'), ThreadPoolExecutor(threads) as pool:
+        for i, array in enumerate(pool.map(lambda p: _decode(p, imgsz), paths)):
+            images[i] = torch.from_numpy(array)
+    
+    # Shared memory lets worker processes read the cache without copying it
+    images.share_memory_()
+    return images, torch.tensor(labels, dtype=torch.int64), class_names
+
+def score_checkpoint(checkpoint, images, labels, class_names, batch=64, imgsz=None):
+    """
+    Score one checkpoint against a decoded test split
+    
+    Args:
+        imgsz: Model input size, defaults to the size the checkpoint was trained
+            at; images are resized on the fly when it differs from the cache
+    
+    Returns:
+        Dict with top1, top5, per-class recall and latency (ms/image)
+    """
+    model = YOLO(checkpoint).model.float().eval()
+    imgsz = imgsz or (getattr(model, 'args', None) or {}).get('imgsz') or images.shape[-1]
+    name_to_idx = {name: idx for idx, name in model.names.items()}
+    missing = [name for name in class_names if name not in name_to_idx]
+    if missing:
+        raise ValueError(f"{checkpoint} has no classes: {missing}")
+    # Reorder model outputs to the test split's class order
+    order = torch.tensor([name_to_idx[name] for name in class_names])
+    
+    top5_preds, elapsed = [], 0.0
+    with torch.inference_mode():
+        for start in range(0, len(images), batch):
+            x = images[start:start + batch].float() / 255.0
+            if imgsz != x.shape[-1]:
+                x = torch.nn.functional.interpolate(x, size=(imgsz, imgsz), mode='bilinear',
+                                                    align_corners=False, antialias=True)
+            t0 = time.perf_counter()
+            probs = model(x)
+            elapsed += time.perf_counter() - t0
+            probs = probs[0] if isinstance(probs, (list, tuple)) else probs
+            top5_preds.append(probs[:, order].topk(min(5, len(class_names)), dim=1).indices)
+            observe_batch(len(x))
+    
+    top5_preds = torch.cat(top5_preds)
+    correct1 = top5_preds[:, 0] == labels
+    correct5 = (top5_preds == labels[:, None]).any(dim=1)
+    inc('images_processed', len(labels))
+    
+    row = {
+        'checkpoint': str(checkpoint),
+        'imgsz': imgsz,
+        'top1': correct1.float().mean().item(),
+        'top5': correct5.float().mean().item(),
+        'latency_ms': 1000.0 * elapsed / max(len(labels), 1),
+    }
+    for label, name in enumerate(class_names):
+        mask = labels == label
+        row[f"recall/{name}"] = correct1[mask].float().mean().item() if mask.any() else float('nan')
+    return row
+
+def _init_worker(test_set, threads):
+    global _shared_test_set
+    _shared_test_set = test_set
+    torch.set_num_threads(threads)
+
+def _score_shared(checkpoint, batch):
+    images, labels, class_names = _shared_test_set
+    return score_checkpoint(checkpoint, images, labels, class_names, batch)
+
+def compare_checkpoints(checkpoints, data_dir='data/images/test', imgsz=224, batch=64, processes=0):
+    """
+    Evaluate several checkpoints on a test split decoded only once
+    
+    Args:
+        checkpoints: Checkpoint paths and/or glob patterns
+        data_dir: Test split directory
+        imgsz: Input size
+        batch: Inference batch size
+        processes: Worker processes (0 scores sequentially in this process)
+    
+    Returns:
+        DataFrame with one row per checkpoint
+    """
+    if isinstance(checkpoints, str):
+        checkpoints = [checkpoints]
+    paths = []
+    for pattern in checkpoints:
+        paths.extend(sorted(glob.glob(pattern)) or [pattern])
+    
+    test_set = load_test_split(data_dir, imgsz)
+    print(f"📊 Scoring {len(paths)} checkpoints...")
+    
+    if processes and processes > 1:
+        ctx = torch.multiprocessing.get_context('spawn')
+        threads = max(1, torch.get_num_threads() // processes)
+        with ProcessPoolExecutor(processes, mp_context=ctx, initializer=_init_worker,
+                                 initargs=(test_set, threads)) as pool:
+            rows = list(pool.map(_score_shared, paths, [batch] * len(paths)))
+    else:
+        rows = [score_checkpoint(path, *test_set, batch=batch) for path in paths]
+    
+    return pd.DataFrame(rows).sort_values('top1', ascending=False, ignore_index=True)
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate trained models on the test set")
+    parser.add_argument('model', nargs='?', default=None, help="Weights path (default: active registry version)")
+    parser.add_argument('--compare', nargs='+', metavar='CKPT',
+                        help="Checkpoint paths/globs to score on one shared decoded test set")
+    parser.add_argument('--processes', type=int, default=0, help="Worker processes for --compare")
+    parser.add_argument('--batch', type=int, default=64, help="Batch size for --compare")
+    parser.add_argument('--imgsz', type=int, default=224, help="Input size for --compare")
+    args = parser.parse_args()
+    
     print("="*70)
     print("MODEL EVALUATION - TEST SET")
     print("="*70)
     
-    metrics = evaluate_model()
+    configure_from_env()
+    if args.compare:
+        table = compare_checkpoints(args.compare, imgsz=args.imgsz, batch=args.batch, processes=args.processes)
+        print("\n✅ Checkpoint Comparison:")
+        print(table.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    else:
+        metrics = evaluate_model(args.model)
@@ -0,0 +1,32 @@
+"""
+Solar Panel Fault Detection - Fault Catalog
+===========================================
+Fault classes, severities, statuses and the technician roster
+"""
+
+# Fault info
+FAULT_INFO = {
+    'Cell': {'severity': 'High', 'icon': '⚡', 'loss': '5-15%', 'action': 'Inspect cell, check connections'},
+    'Cell-Multi': {'severity': 'Critical', 'icon': '🔥', 'loss': '20-40%', 'action': 'Replace module immediately'},
+    'Cracking': {'severity': 'Medium', 'icon': '💔', 'loss': '3-10%', 'action': 'Monitor and schedule replacement'},
+    'Diode': {'severity': 'High', 'icon': '⚙️', 'loss': '10-25%', 'action': 'Replace bypass diode'},
+    'Diode-Multi': {'severity': 'Critical', 'icon': '🚨', 'loss': '30-50%', 'action': 'Emergency diode replacement'},
+    'Hot-Spot': {'severity': 'High', 'icon': '🔥', 'loss': '15-30%', 'action': 'Check for shading, replace if needed'},
+    'Hot-Spot-Multi': {'severity': 'Critical', 'icon': '🚨', 'loss': '40-70%', 'action': 'URGENT: Disconnect and replace'},
+    'No-Anomaly': {'severity': 'Low', 'icon': '✅', 'loss': '0%', 'action': 'Continue routine monitoring'},
+    'Offline-Module': {'severity': 'Critical', 'icon': '⚠️', 'loss': '100%', 'action': 'Check connections, test output'},
+    'Shadowing': {'severity': 'Medium', 'icon': '🌳', 'loss': '10-30%', 'action': 'Remove shading source'},
+    'Soiling': {'severity': 'Low', 'icon': '🧹', 'loss': '2-8%', 'action': 'Clean panels'},
+    'Vegetation': {'severity': 'Medium', 'icon': '🌱', 'loss': '5-20%', 'action': 'Remove vegetation'}
+}
+
+# Class the model reports for a healthy panel; it never needs a technician
+HEALTHY_CLASS = 'No-Anomaly'
+
+SEVERITY_LEVELS = ['Critical', 'High', 'Medium', 'Low']
+
+STATUSES = ['New', 'Assigned', 'In Progress', 'Pending', 'Completed']
+CLOSED_STATUS = 'Completed'
+
+UNASSIGNED = 'Unassigned'
+TECHNICIANS = ['John Smith', 'Sarah Johnson', 'Mike Chen', 'Emma Davis']
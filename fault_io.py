@@ -0,0 +1,292 @@
+"""
+Solar Panel Fault Detection - Fault Import/Export
+=================================================
+Chunked CSV/Parquet import and export of fault records
+
+Files are streamed in fixed-size chunks. Each chunk is validated with
+vectorized pandas checks against FAULT_INFO, the severity and status lists
+and the technician roster, and collapsed to one row per panel (factorized
+panel IDs, a lexsort by panel and last-seen time, and numpy reduceat for the
+seen-range and detection counts) before being merged into the PanelTracker,
+so memory is bounded by the chunk size rather than the file size.
+
+Every imported or exported file is fingerprinted by content and remembered
+on the tracker, so importing the same file twice, or re-importing an export
+of the tracker, is skipped instead of double-counting detections.
+"""
+
+from fault_catalog import FAULT_INFO, SEVERITY_LEVELS, STATUSES, UNASSIGNED, TECHNICIANS
+from panel_tracking import FAULT_TABLE_COLUMNS, DATE_FORMAT
+from pathlib import Path
+import pandas as pd
+import numpy as np
+import hashlib
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = pa_csv = pq = None
+
+REQUIRED_COLUMNS = ['Panel ID', 'Fault Type', 'Detected']
+FAULT_COLUMNS = ['Panel ID', 'Fault Type', 'Severity', 'Detected', 'Assigned To', 'Status', 'Efficiency Loss']
+CHUNK_SIZE = 250_000
+
+_DEFAULT_SEVERITY = {name: info['severity'] for name, info in FAULT_INFO.items()}
+_DEFAULT_LOSS = {name: info['loss'] for name, info in FAULT_INFO.items()}
+
+
+def _file_format(source, fmt=None):
+    if fmt:
+        return fmt
+    name = getattr(source, 'name', source)
+    suffix = Path(str(name)).suffix.lower()
+    if suffix in ('.parquet', '.pq'):
+        return 'parquet'
+    if suffix == '.csv':
+        return 'csv'
+    raise ValueError(f"Cannot tell file format of {name}; use .csv or .parquet")
+
+
+def source_fingerprint(source):
+    """SHA-256 of a file's content (path or seekable binary file object)"""
+    digest = hashlib.sha256()
+    if hasattr(source, 'read'):
+        position = source.tell()
+        source.seek(0)
+        for block in iter(lambda: source.read(1 << 20), b''):
+            digest.update(block)
+        source.seek(position)
+    else:
+        with open(source, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def _require_pyarrow():
+    if pq is None:
+        raise ImportError("Parquet import/export requires pyarrow: pip install pyarrow")
+
+
+def _iter_csv_batches(source, chunksize):
+    # Read every column as string so later blocks can't contradict type
+    # inference made on the first one; validate_chunk does the parsing
+    names = pa_csv.open_csv(source).schema.names
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    reader = pa_csv.open_csv(
+        source,
+        read_options=pa_csv.ReadOptions(block_size=max(1 << 20, chunksize * 64)),
+        convert_options=pa_csv.ConvertOptions(column_types={name: pa.string() for name in names},
+                                              strings_can_be_null=True),
+    )
+    for batch in reader:
+        yield batch.to_pandas()
+
+
+def iter_fault_chunks(source, fmt=None, chunksize=CHUNK_SIZE):
+    """
+    Yield DataFrame chunks of raw fault records from a CSV or Parquet file
+
+    CSV is read with pyarrow's multithreaded streaming reader when available
+    (chunks are then sized by bytes, roughly `chunksize` rows), falling back
+    to pandas.
+    """
+    fmt = _file_format(source, fmt)
+    if fmt == 'csv':
+        if pa_csv is not None:
+            yield from _iter_csv_batches(source, chunksize)
+        else:
+            yield from pd.read_csv(source, dtype=str, chunksize=chunksize, keep_default_na=False, na_values=[''])
+    else:
+        _require_pyarrow()
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+
+
+def validate_chunk(chunk):
+    """
+    Validate and normalise one chunk of fault records
+
+    Missing severity and efficiency loss are filled from FAULT_INFO, missing
+    assignment with 'Unassigned' and missing status with 'New'. Optional
+    'Last Seen' and 'Detections' columns (as written by export_faults) are
+    kept so an export can be re-imported without losing history counts.
+
+    Returns:
+        (valid, rejected) DataFrames; rejected has an extra 'Error' column
+    """
+    missing = [col for col in REQUIRED_COLUMNS if col not in chunk.columns]
+    if missing:
+        raise ValueError(f"Fault records are missing columns: {missing}")
+
+    df = pd.DataFrame(index=chunk.index)
+    for col in FAULT_COLUMNS:
+        if col == 'Detected':
+            continue
+        if col in chunk.columns:
+            # Plain object strings: much cheaper to iterate than extension arrays
+            values = chunk[col]
+            df[col] = values.astype(str).str.strip().where(values.notna())
+        else:
+            df[col] = None
+
+    df['Severity'] = df['Severity'].fillna(df['Fault Type'].map(_DEFAULT_SEVERITY))
+    df['Efficiency Loss'] = df['Efficiency Loss'].fillna(df['Fault Type'].map(_DEFAULT_LOSS))
+    df['Assigned To'] = df['Assigned To'].fillna(UNASSIGNED)
+    df['Status'] = df['Status'].fillna('New')
+    # Parse per element: inferring one format from the first row turns every
+    # row written differently (date only vs date and time, etc.) into NaT
+    detected = pd.to_datetime(chunk['Detected'], errors='coerce', format='mixed')
+
+    checks = [
+        (df['Panel ID'].fillna('').eq(''), 'missing panel ID'),
+        (~df['Fault Type'].isin(list(FAULT_INFO)), 'unknown fault type'),
+        (~df['Severity'].isin(SEVERITY_LEVELS), 'invalid severity'),
+        (~df['Status'].isin(STATUSES), 'invalid status'),
+        (~df['Assigned To'].isin([UNASSIGNED] + TECHNICIANS), 'unknown technician'),
+        (detected.isna(), 'invalid detected time'),
+    ]
+    masks = [mask.fillna(True).to_numpy(dtype=bool) for mask, _ in checks]
+    errors = np.select(masks, [reason for _, reason in checks], default='')
+    bad = errors != ''
+
+    df['Detected'] = detected
+    df['Last Seen'] = (pd.to_datetime(chunk['Last Seen'], errors='coerce', format='mixed').fillna(detected)
+                       if 'Last Seen' in chunk.columns else detected)
+    df['Detections'] = (pd.to_numeric(chunk['Detections'], errors='coerce').fillna(1).astype('int64')
+                        if 'Detections' in chunk.columns else 1)
+    rejected = chunk.loc[bad].copy()
+    rejected['Error'] = errors[bad]
+    return df.loc[~bad], rejected
+
+
+def _aggregate(valid):
+    """Collapse a validated chunk to one row per panel from its latest record"""
+    codes, _ = pd.factorize(valid['Panel ID'])
+    # Group rows by panel, ordered by last seen within each panel (lexsort is stable)
+    order = np.lexsort((valid['Last Seen'].to_numpy(), codes))
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    ends = np.r_[starts[1:], len(order)] - 1
+
+    latest = valid.iloc[order[ends]].reset_index(drop=True)
+    latest['First Seen'] = np.minimum.reduceat(valid['Detected'].to_numpy()[order], starts)
+    latest['Last Seen'] = valid['Last Seen'].to_numpy()[order[ends]]
+    latest['Detections'] = np.add.reduceat(valid['Detections'].to_numpy()[order], starts)
+    return latest
+
+
+def import_faults(source, tracker, fmt=None, chunksize=CHUNK_SIZE, errors_path=None):
+    """
+    Stream fault records from CSV/Parquet into a PanelTracker
+
+    A file already imported into (or exported from) the tracker is counted
+    but not merged again.
+
+    Args:
+        source: File path or file-like object
+        tracker: PanelTracker to merge into
+        fmt: 'csv' or 'parquet', inferred from the file name if omitted
+        chunksize: Rows per chunk
+        errors_path: Optional CSV file collecting rejected rows with reasons
+
+    Returns:
+        Dict with rows read, merged, skipped (already imported) and
+        rejected, and panels created
+    """
+    summary = {'rows_read': 0, 'rows_merged': 0, 'rows_skipped': 0, 'rows_rejected': 0,
+               'panels_created': 0}
+    fingerprint = source_fingerprint(source)
+    if fingerprint in tracker.sources:
+        for chunk in iter_fault_chunks(source, fmt, chunksize):
+            summary['rows_read'] += len(chunk)
+        summary['rows_skipped'] = summary['rows_read']
+        return summary
+
+    write_header = True
+    for chunk in iter_fault_chunks(source, fmt, chunksize):
+        valid, rejected = validate_chunk(chunk)
+        summary['rows_read'] += len(chunk)
+        summary['rows_merged'] += len(valid)
+        summary['rows_rejected'] += len(rejected)
+
+        if errors_path is not None and len(rejected):
+            rejected.to_csv(errors_path, mode='w' if write_header else 'a', header=write_header, index=False)
+            write_header = False
+
+        if valid.empty:
+            continue
+        latest = _aggregate(valid)
+        columns = [latest[col].to_numpy(dtype=object) for col in (
+            'Panel ID', 'Fault Type', 'Severity', 'Efficiency Loss')]
+        # datetime64[us] -> object yields datetime.datetime without per-row Timestamp boxing
+        columns += [latest[col].to_numpy(dtype='datetime64[us]').astype(object)
+                    for col in ('First Seen', 'Last Seen')]
+        columns.append(latest['Detections'].to_numpy(dtype=np.int64).tolist())
+        columns += [latest[col].to_numpy(dtype=object) for col in ('Assigned To', 'Status')]
+        for row in zip(*columns):
+            _, created = tracker.merge(*row)
+            summary['panels_created'] += created
+
+    tracker.sources.add(fingerprint)
+    return summary
+
+
+def _record_chunks(source, chunksize):
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            yield source.iloc[start:start + chunksize]
+        return
+
+    # PanelTracker: build records lazily so only one chunk is materialised
+    records = []
+    for state in source.panels.values():
+        records.append(state.to_record())
+        if len(records) >= chunksize:
+            yield pd.DataFrame(records, columns=FAULT_TABLE_COLUMNS)
+            records = []
+    if records:
+        yield pd.DataFrame(records, columns=FAULT_TABLE_COLUMNS)
+
+
+def export_faults(source, target, fmt=None, chunksize=CHUNK_SIZE):
+    """
+    Write fault records to CSV or Parquet in chunks
+
+    Exporting a PanelTracker to a path or readable buffer remembers the
+    file's fingerprint, so importing it back into the same tracker is a no-op.
+
+    Args:
+        source: PanelTracker or fault table DataFrame
+        target: File path or binary file-like object
+        fmt: 'csv' or 'parquet', inferred from the file name if omitted
+        chunksize: Rows per chunk (one Parquet row group each)
+
+    Returns:
+        Number of rows written
+    """
+    fmt = _file_format(target, fmt)
+    rows = 0
+    writer = None
+    try:
+        for chunk in _record_chunks(source, chunksize):
+            if fmt == 'csv':
+                chunk.to_csv(target, mode='w' if rows == 0 else 'a', header=rows == 0,
+                             index=False, date_format=DATE_FORMAT)
+            else:
+                _require_pyarrow()
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(target, table.schema, compression='zstd')
+                writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if hasattr(source, 'sources') and (not hasattr(target, 'write') or hasattr(target, 'getvalue')):
+        source.sources.add(source_fingerprint(target))
+    return rows
@@ -0,0 +1,262 @@
+"""
+Solar Panel Fault Detection - Hyperparameter Search
+===================================================
+Parallel ASHA (asynchronous successive halving) over train.TRAIN_CONFIG
+
+Short trials run concurrently on CPU, one process per trial. A trial that
+finishes rung k is promoted to rung k+1 (eta times the total epoch budget)
+only while it ranks in the top 1/eta of everything completed at rung k;
+otherwise a free worker starts a new trial. A promoted trial fine-tunes its
+rung-k weights for the extra epochs with a fresh optimizer and LR schedule;
+only rung 0 warms up, for a fraction of its budget, so no rung is spent
+mostly in warmup. Every rung
+result, with its config and validation top-1 curve, is appended to
+trials.jsonl. The best trial at the highest rung reached is then promoted to
+a full training run via train.train_model.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import multiprocessing as mp
+from pathlib import Path
+import argparse
+import random
+import json
+import math
+import csv
+import os
+
+SEARCH_DIR = Path('runs/hparam_search')
+
+# Share of the rung 0 epochs spent warming up (ultralytics defaults to 3 epochs)
+WARMUP_FRACTION = 0.25
+MAX_WARMUP_EPOCHS = 3.0
+
+# Choice lists are sampled uniformly; ('uniform'|'log', low, high) ranges continuously
+SEARCH_SPACE = {
+    'optimizer': ['AdamW', 'Adam', 'SGD'],
+    'lr0': ('log', 1e-4, 1e-2),
+    'weight_decay': ('log', 1e-5, 1e-3),
+    'batch': [16, 32, 64],
+    'hsv_h': ('uniform', 0.0, 0.03),
+    'hsv_s': ('uniform', 0.0, 0.9),
+    'hsv_v': ('uniform', 0.0, 0.6),
+    'degrees': ('uniform', 0.0, 20.0),
+    'translate': ('uniform', 0.0, 0.2),
+    'scale': ('uniform', 0.2, 0.7),
+    'fliplr': ('uniform', 0.0, 0.5),
+}
+
+
+def sample_config(rng, space=SEARCH_SPACE):
+    """Draw one configuration from the search space"""
+    config = {}
+    for key, spec in space.items():
+        if isinstance(spec, list):
+            config[key] = rng.choice(spec)
+        elif spec[0] == 'log':
+            config[key] = math.exp(rng.uniform(math.log(spec[1]), math.log(spec[2])))
+        else:
+            config[key] = rng.uniform(spec[1], spec[2])
+    return config
+
+
+def read_top1_curve(run_dir):
+    """Validation top-1 per epoch from an ultralytics results.csv"""
+    results_csv = Path(run_dir) / 'results.csv'
+    if not results_csv.exists():
+        return []
+    with open(results_csv) as f:
+        rows = [{k.strip(): v for k, v in row.items()} for row in csv.DictReader(f)]
+    return [float(row['metrics/accuracy_top1']) for row in rows]
+
+
+def _init_worker(threads):
+    import torch
+    torch.set_num_threads(threads)
+
+
+def run_trial(trial_id, rung, config, epochs, weights, search_dir, workers):
+    """Train one rung of a trial and return its validation curve"""
+    from ultralytics import YOLO
+    from train import TRAIN_CONFIG
+
+    run_name = f"trial_{trial_id:03d}_rung{rung}"
+    model = YOLO(weights or 'yolov8n-cls.pt')
+    model.train(
+        data='data/images',
+        **{
+            **TRAIN_CONFIG,
+            **config,
+            'epochs': epochs,
+            # Promoted rungs start from trained weights and need no warmup.
+            # Ultralytics still warms up for at least 100 iterations when > 0
+            'warmup_epochs': min(MAX_WARMUP_EPOCHS, epochs * WARMUP_FRACTION) if rung == 0 else 0,
+            'device': 'cpu',
+            'amp': False,
+            'patience': epochs,
+            'save_period': -1,
+            'plots': False,
+            'verbose': False,
+            'workers': workers,
+            'project': str(search_dir),
+            'name': run_name,
+        }
+    )
+
+    run_dir = Path(search_dir) / run_name
+    curve = read_top1_curve(run_dir)
+    return {
+        'trial': trial_id,
+        'rung': rung,
+        'epochs': epochs,
+        'config': config,
+        'top1': curve[-1] if curve else 0.0,
+        'curve': curve,
+        'weights': str(run_dir / 'weights' / 'last.pt'),
+    }
+
+
+class ASHAScheduler:
+    """
+    Bookkeeping for asynchronous successive halving
+
+    Args:
+        n_trials: Maximum number of configurations to start
+        min_epochs: Epochs trained at rung 0
+        eta: Reduction factor between rungs
+        max_rung: Highest rung index (trains min_epochs * eta**max_rung epochs in total)
+        seed: Seed for config sampling
+    """
+
+    def __init__(self, n_trials=27, min_epochs=2, eta=3, max_rung=2, seed=0):
+        self.n_trials = n_trials
+        self.min_epochs = min_epochs
+        self.eta = eta
+        self.max_rung = max_rung
+        self.rng = random.Random(seed)
+        self.configs = {}
+        self.results = [dict() for _ in range(max_rung + 1)]
+        self.promoted = [set() for _ in range(max_rung + 1)]
+
+    def rung_epochs(self, rung):
+        """Additional epochs needed to go from rung-1 to rung"""
+        budget = self.min_epochs * self.eta ** rung
+        previous = self.min_epochs * self.eta ** (rung - 1) if rung else 0
+        return budget - previous
+
+    def next_job(self):
+        """(trial_id, rung) to run next, or None if nothing is ready"""
+        # Prefer promotions from the highest rung down
+        for rung in reversed(range(self.max_rung)):
+            done = self.results[rung]
+            top_k = len(done) // self.eta
+            ranked = sorted(done, key=lambda t: done[t]['top1'], reverse=True)[:top_k]
+            for trial_id in ranked:
+                if trial_id not in self.promoted[rung]:
+                    self.promoted[rung].add(trial_id)
+                    return trial_id, rung + 1
+
+        if len(self.configs) < self.n_trials:
+            trial_id = len(self.configs)
+            self.configs[trial_id] = sample_config(self.rng)
+            return trial_id, 0
+        return None
+
+    def report(self, result):
+        self.results[result['rung']][result['trial']] = result
+
+    def best(self):
+        """Best result at the highest rung that has any results"""
+        for rung in reversed(range(self.max_rung + 1)):
+            if self.results[rung]:
+                return max(self.results[rung].values(), key=lambda r: r['top1'])
+        return None
+
+
+def search(n_trials=27, min_epochs=2, eta=3, max_rung=2, n_workers=None,
+           threads_per_trial=2, search_dir=SEARCH_DIR, seed=0):
+    """
+    Run an ASHA search and return the best trial result
+
+    Args:
+        n_trials: Maximum number of configurations to try
+        min_epochs: Epochs per trial at the first rung
+        eta: Keep the top 1/eta of each rung
+        max_rung: Number of promotions a trial can earn
+        n_workers: Concurrent trials, defaults to cpu_count // threads_per_trial
+        threads_per_trial: Torch threads per trial process
+        search_dir: Output directory for trial runs and trials.jsonl
+        seed: Seed for config sampling
+    """
+    search_dir = Path(search_dir)
+    search_dir.mkdir(parents=True, exist_ok=True)
+    log_file = search_dir / 'trials.jsonl'
+    n_workers = n_workers or max(1, (os.cpu_count() or 1) // threads_per_trial)
+
+    scheduler = ASHAScheduler(n_trials, min_epochs, eta, max_rung, seed)
+    print(f"🔬 ASHA search: {n_trials} trials, {n_workers} workers, "
+          f"rungs of {[min_epochs * eta ** r for r in range(max_rung + 1)]} epochs")
+
+    ctx = mp.get_context('spawn')
+    with ProcessPoolExecutor(n_workers, mp_context=ctx, initializer=_init_worker,
+                             initargs=(threads_per_trial,)) as pool:
+        running = {}
+
+        def fill():
+            while len(running) < n_workers:
+                job = scheduler.next_job()
+                if job is None:
+                    return
+                trial_id, rung = job
+                weights = scheduler.results[rung - 1][trial_id]['weights'] if rung else None
+                future = pool.submit(run_trial, trial_id, rung, scheduler.configs[trial_id],
+                                     scheduler.rung_epochs(rung), weights, search_dir,
+                                     min(2, threads_per_trial))
+                running[future] = job
+
+        fill()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                trial_id, rung = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"⚠️  Trial {trial_id} rung {rung} failed: {e}")
+                    continue
+                scheduler.report(result)
+                with open(log_file, 'a') as f:
+                    f.write(json.dumps(result) + '\n')
+                print(f"   Trial {trial_id:03d} rung {rung}: top1={result['top1']:.4f}")
+            fill()
+
+    best = scheduler.best()
+    if best is not None:
+        print(f"\n🏆 Best trial {best['trial']} (rung {best['rung']}): top1={best['top1']:.4f}")
+        print(f"   Config: {best['config']}")
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ASHA hyperparameter search for train.py")
+    parser.add_argument('--trials', type=int, default=27, help="Maximum configurations to try")
+    parser.add_argument('--min-epochs', type=int, default=2, help="Epochs at the first rung")
+    parser.add_argument('--eta', type=int, default=3, help="Keep the top 1/eta per rung")
+    parser.add_argument('--max-rung', type=int, default=2, help="Promotions a trial can earn")
+    parser.add_argument('--workers', type=int, default=None, help="Concurrent trials")
+    parser.add_argument('--threads', type=int, default=2, help="Torch threads per trial")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-promote', action='store_true', help="Skip the full training run")
+    args = parser.parse_args()
+
+    print("="*70)
+    print("SOLAR PANEL FAULT DETECTION - HYPERPARAMETER SEARCH")
+    print("="*70)
+
+    best = search(args.trials, args.min_epochs, args.eta, args.max_rung,
+                  args.workers, args.threads, seed=args.seed)
+
+    if best is not None and not args.no_promote:
+        from train import train_model
+        print("\n🚀 Promoting best configuration to a full training run...")
+        train_model(overrides={**best['config'], 'name': 'solar_fault_detection_search'})
@@ -0,0 +1,279 @@
+"""
+Solar Panel Fault Detection - Instrumentation
+=============================================
+Per-stage timing histograms and counters with Prometheus/JSON export
+
+Disabled by default; enable with SOLAR_METRICS=1 or enable(). While disabled,
+timer() returns a shared no-op context manager and the record functions
+return immediately.
+
+Environment:
+    SOLAR_METRICS=1             Enable recording
+    SOLAR_METRICS_PORT=9108     Serve Prometheus text at http://host:port/metrics
+    SOLAR_METRICS_JSON=file     Dump metrics as JSON periodically and at exit
+    SOLAR_METRICS_INTERVAL=60   JSON dump interval in seconds
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from contextlib import nullcontext
+from bisect import bisect_left
+from pathlib import Path
+import threading
+import atexit
+import json
+import time
+import os
+
+PREFIX = 'solar'
+
+# Seconds, covering sub-millisecond preprocessing up to slow model loads
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+_enabled = os.environ.get('SOLAR_METRICS', '') not in ('', '0')
+_NULL_TIMER = nullcontext()
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[idx] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self):
+        with self._lock:
+            counts, count, total = list(self.counts), self.count, self.sum
+        cumulative, running = [], 0
+        for c in counts[:-1]:
+            running += c
+            cumulative.append(running)
+        return {
+            'buckets': dict(zip(self.buckets, cumulative)),
+            'count': count,
+            'sum': total,
+        }
+
+
+class Metrics:
+    """Thread-safe store of labelled histograms, counters and gauges"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, stage=None, buckets=DURATION_BUCKETS):
+        key = (name, stage)
+        hist = self.histograms.get(key)
+        if hist is None:
+            with self._lock:
+                hist = self.histograms.setdefault(key, Histogram(buckets))
+        return hist
+
+    def inc(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    def _snapshot(self):
+        # Copy under the lock so a scrape can't race a first-time insert
+        with self._lock:
+            return list(self.histograms.items()), dict(self.counters), dict(self.gauges)
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.gauges.clear()
+
+    def to_dict(self):
+        items, counters, gauges = self._snapshot()
+        histograms = {}
+        for (name, stage), hist in sorted(items, key=lambda kv: (kv[0][0], kv[0][1] or '')):
+            snap = hist.snapshot()
+            snap['buckets'] = {str(b): c for b, c in snap['buckets'].items()}
+            histograms.setdefault(name, {})[stage or ''] = snap
+        return {
+            'timestamp': time.time(),
+            'histograms': histograms,
+            'counters': counters,
+            'gauges': gauges,
+        }
+
+    def render_prometheus(self):
+        items, counters, gauges = self._snapshot()
+        lines = []
+        families = {}
+        for (name, stage), hist in items:
+            families.setdefault(name, []).append((stage, hist))
+
+        for name in sorted(families):
+            metric = f"{PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} histogram")
+            for stage, hist in sorted(families[name], key=lambda s: s[0] or ''):
+                snap = hist.snapshot()
+                label = f'stage="{stage}",' if stage else ''
+                for bound, count in snap['buckets'].items():
+                    lines.append(f'{metric}_bucket{{{label}le="{bound}"}} {count}')
+                lines.append(f'{metric}_bucket{{{label}le="+Inf"}} {snap["count"]}')
+                suffix = f'{{{label.rstrip(",")}}}' if label else ''
+                lines.append(f'{metric}_sum{suffix} {snap["sum"]}')
+                lines.append(f'{metric}_count{suffix} {snap["count"]}')
+
+        for name, value in sorted(counters.items()):
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            lines.append(f"{PREFIX}_{name}_total {value}")
+
+        for name, value in sorted(gauges.items()):
+            lines.append(f"# TYPE {PREFIX}_{name} gauge")
+            lines.append(f"{PREFIX}_{name} {value}")
+
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = Metrics()
+
+
+class _StageTimer:
+    __slots__ = ('hist', 'start')
+
+    def __init__(self, hist):
+        self.hist = hist
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.start)
+        return False
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def timer(stage):
+    """Context manager recording the duration of a pipeline stage"""
+    if not _enabled:
+        return _NULL_TIMER
+    return _StageTimer(METRICS.histogram('stage_duration_seconds', stage))
+
+
+def observe(stage, seconds):
+    """Record a stage duration measured elsewhere"""
+    if _enabled:
+        METRICS.histogram('stage_duration_seconds', stage).observe(seconds)
+
+
+def observe_batch(size):
+    """Record the size of an inference or evaluation batch"""
+    if _enabled:
+        METRICS.histogram('batch_size', buckets=SIZE_BUCKETS).observe(size)
+
+
+def record_speed(speed, prefix='yolo_'):
+    """Record an ultralytics `speed` dict (milliseconds per image) as stages"""
+    if _enabled and speed:
+        for stage, ms in speed.items():
+            if ms is not None:
+                observe(f"{prefix}{stage}", ms / 1000.0)
+
+
+def inc(name, amount=1):
+    if _enabled:
+        METRICS.inc(name, amount)
+
+
+def set_gauge(name, value):
+    if _enabled:
+        METRICS.set_gauge(name, value)
+
+
+def dump_json(path):
+    """Write a JSON snapshot of all metrics"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(METRICS.to_dict(), f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def start_json_dump(path, interval=60.0):
+    """Dump metrics to `path` every `interval` seconds and once at exit"""
+    stop = threading.Event()
+
+    def _loop():
+        while not stop.wait(interval):
+            dump_json(path)
+
+    thread = threading.Thread(target=_loop, daemon=True)
+    thread.start()
+    atexit.register(dump_json, path)
+    return stop
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip('/') not in ('/metrics', ''):
+            self.send_error(404)
+            return
+        body = METRICS.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port=9108, host='0.0.0.0'):
+    """Serve Prometheus text format on a background thread"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def configure_from_env():
+    """Start the exporters requested through SOLAR_METRICS_* variables"""
+    if not _enabled:
+        return None
+    server = None
+    port = os.environ.get('SOLAR_METRICS_PORT')
+    if port:
+        server = start_http_server(int(port))
+        print(f"📈 Metrics endpoint: http://localhost:{port}/metrics")
+    json_path = os.environ.get('SOLAR_METRICS_JSON')
+    if json_path:
+        start_json_dump(json_path, float(os.environ.get('SOLAR_METRICS_INTERVAL', 60)))
+    return server
@@ -0,0 +1,299 @@
+"""
+Solar Panel Fault Detection - Model Registry
+============================================
+Versioned local registry of trained weights with checksum-verified hot-swap
+"""
+
+from ultralytics import YOLO
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import threading
+import hashlib
+import shutil
+import json
+import os
+import sys
+
+DEFAULT_MODEL_PATH = 'runs/classify/solar_fault_detection/weights/best.pt'
+REGISTRY_DIR = Path('models')
+REGISTRY_FILE = REGISTRY_DIR / 'registry.json'
+
+
+def file_checksum(path, chunk_size=1 << 20):
+    """Return the SHA-256 hex digest of a weights file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_registry(registry_file=REGISTRY_FILE):
+    """Load the registry, returning an empty one if none exists yet"""
+    registry_file = Path(registry_file)
+    if not registry_file.exists():
+        return {'active': None, 'history': [], 'versions': {}}
+    with open(registry_file) as f:
+        return json.load(f)
+
+
+def save_registry(registry, registry_file=REGISTRY_FILE):
+    """Write the registry atomically so readers never see a partial file"""
+    registry_file = Path(registry_file)
+    registry_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = registry_file.with_suffix('.tmp')
+    with open(tmp_file, 'w') as f:
+        json.dump(registry, f, indent=2)
+    os.replace(tmp_file, registry_file)
+
+
+def metrics_to_dict(metrics):
+    """Extract the accuracy figures from `evaluate.evaluate_model` results"""
+    if metrics is None:
+        return {}
+    if isinstance(metrics, dict):
+        return dict(metrics)
+    return {
+        'top1': float(metrics.top1),
+        'top5': float(metrics.top5),
+    }
+
+
+def register_model(model_path, version=None, metrics=None, imgsz=224,
+                   registry_file=REGISTRY_FILE, activate=False):
+    """
+    Copy weights into the registry and record their metadata
+
+    Args:
+        model_path: Path to trained weights (.pt)
+        version: Version label, defaults to a timestamp
+        metrics: Metrics object from evaluate_model, or a plain dict
+        imgsz: Input size the model was trained at
+        registry_file: Registry JSON file
+        activate: Make this version the serving version
+    """
+    registry_file = Path(registry_file)
+    registry = load_registry(registry_file)
+    version = version or datetime.now().strftime('v%Y%m%d_%H%M%S')
+    if version in registry['versions']:
+        raise ValueError(f"Model version already registered: {version}")
+
+    version_dir = registry_file.parent / version
+    version_dir.mkdir(parents=True, exist_ok=True)
+    stored_path = version_dir / Path(model_path).name
+    shutil.copy2(model_path, stored_path)
+
+    registry['versions'][version] = {
+        'path': str(stored_path),
+        'checksum': file_checksum(stored_path),
+        'metrics': metrics_to_dict(metrics),
+        'imgsz': imgsz,
+        'source': str(model_path),
+        'registered': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    save_registry(registry, registry_file)
+    print(f"📦 Registered model {version}: {stored_path}")
+
+    if activate:
+        set_active(version, registry_file)
+    return version
+
+
+def verify_model(version, registry_file=REGISTRY_FILE):
+    """Return the weights path of a version after checking its checksum"""
+    registry = load_registry(registry_file)
+    if version not in registry['versions']:
+        raise KeyError(f"Unknown model version: {version}")
+
+    entry = registry['versions'][version]
+    if file_checksum(entry['path']) != entry['checksum']:
+        raise ValueError(f"Checksum mismatch for model {version}: {entry['path']}")
+    return entry['path']
+
+
+def set_active(version, registry_file=REGISTRY_FILE):
+    """Mark a verified version as the serving version"""
+    verify_model(version, registry_file)
+    registry = load_registry(registry_file)
+    if registry['active'] and registry['active'] != version:
+        registry['history'].append(registry['active'])
+    registry['active'] = version
+    save_registry(registry, registry_file)
+    print(f"✅ Active model: {version}")
+    return version
+
+
+def rollback(registry_file=REGISTRY_FILE):
+    """Reactivate the previously active version"""
+    registry = load_registry(registry_file)
+    if not registry['history']:
+        raise ValueError("No previous model version to roll back to")
+
+    version = registry['history'].pop()
+    verify_model(version, registry_file)
+    registry['active'] = version
+    save_registry(registry, registry_file)
+    print(f"↩️  Rolled back to model: {version}")
+    return version
+
+
+def resolve_model_path(version=None, registry_file=REGISTRY_FILE):
+    """
+    Resolve the weights to load
+
+    Uses the requested version, then the active registry version, and falls
+    back to the default training output when nothing is registered.
+    """
+    registry = load_registry(registry_file)
+    version = version or registry['active']
+    if version is None:
+        return DEFAULT_MODEL_PATH
+    return verify_model(version, registry_file)
+
+
+def active_version(registry_file=REGISTRY_FILE):
+    """Return the active version label, or None if nothing is registered"""
+    return load_registry(registry_file)['active']
+
+
+class ModelServer:
+    """
+    Holds the serving model and swaps versions without downtime
+
+    A new version is loaded and warmed up in a background thread while the
+    current model keeps serving; the switch itself is a single reference
+    assignment under a lock, so callers always see a complete model.
+
+    predict_lock serialises inference for callers that attach per-call state
+    to the shared model, such as an embedding forward hook.
+    """
+
+    def __init__(self, registry_file=REGISTRY_FILE):
+        self.registry_file = registry_file
+        self._lock = threading.Lock()
+        self.predict_lock = threading.Lock()
+        self._swap_lock = threading.Lock()
+        self._model = None
+        self._version = None
+        self._loading = None
+        self.last_error = None
+
+        try:
+            version = active_version(registry_file)
+            self._model = self._load(resolve_model_path(version, registry_file), version)
+            self._version = version
+        except Exception as e:
+            self.last_error = e
+
+    @property
+    def model(self):
+        with self._lock:
+            return self._model
+
+    @property
+    def version(self):
+        with self._lock:
+            return self._version
+
+    @property
+    def loading(self):
+        return self._swap_lock.locked()
+
+    def _load(self, model_path, version):
+        model = YOLO(model_path)
+        entry = load_registry(self.registry_file)['versions'].get(version, {})
+        imgsz = entry.get('imgsz', 224)
+        # Warm up so the first real request doesn't pay for lazy init
+        model.predict(np.zeros((imgsz, imgsz, 3), dtype=np.uint8), verbose=False)
+        return model
+
+    def _switch(self, version, update_registry):
+        try:
+            model = self._load(verify_model(version, self.registry_file), version)
+            update_registry()
+            with self._lock:
+                self._model, self._version = model, version
+            self.last_error = None
+        except Exception as e:
+            self.last_error = e
+        finally:
+            self._swap_lock.release()
+
+    def _claim(self):
+        # Non-blocking acquire is the check and the claim in one step, so two
+        # sessions can't both start a swap and race on registry.json
+        if not self._swap_lock.acquire(blocking=False):
+            raise RuntimeError("A model swap is already in progress")
+
+    def _start(self, version, update_registry, background):
+        if not background:
+            self._switch(version, update_registry)
+            return None
+        try:
+            self._loading = threading.Thread(target=self._switch, args=(version, update_registry),
+                                             daemon=True)
+            self._loading.start()
+        except BaseException:
+            self._swap_lock.release()
+            raise
+        return self._loading
+
+    def swap(self, version, background=True):
+        """Load, warm and switch to a registered version"""
+        self._claim()
+        return self._start(version, lambda: set_active(version, self.registry_file), background)
+
+    def rollback(self, background=True):
+        """Swap back to the previously active version"""
+        self._claim()
+        try:
+            registry = load_registry(self.registry_file)
+            if not registry['history']:
+                raise ValueError("No previous model version to roll back to")
+        except BaseException:
+            self._swap_lock.release()
+            raise
+        return self._start(registry['history'][-1], lambda: rollback(self.registry_file), background)
+
+
+def print_registry(registry_file=REGISTRY_FILE):
+    """Print all registered versions"""
+    registry = load_registry(registry_file)
+    if not registry['versions']:
+        print("No models registered")
+        return
+    for version, entry in registry['versions'].items():
+        marker = '*' if version == registry['active'] else ' '
+        top1 = entry['metrics'].get('top1')
+        top1 = f"{top1:.4f}" if top1 is not None else 'n/a'
+        print(f" {marker} {version}  top1={top1}  imgsz={entry['imgsz']}  {entry['path']}")
+
+
+if __name__ == "__main__":
+    usage = (
+        "Usage: python model_registry.py list\n"
+        "       python model_registry.py register <weights.pt> [version] [--evaluate] [--activate]\n"
+        "       python model_registry.py activate <version>\n"
+        "       python model_registry.py rollback"
+    )
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    flags = [a for a in sys.argv[1:] if a.startswith('--')]
+
+    if not args:
+        print(usage)
+    elif args[0] == 'list':
+        print_registry()
+    elif args[0] == 'register' and len(args) >= 2:
+        metrics = None
+        if '--evaluate' in flags:
+            from evaluate import evaluate_model
+            metrics = evaluate_model(args[1])
+        register_model(args[1], args[2] if len(args) > 2 else None,
+                       metrics=metrics, activate='--activate' in flags)
+    elif args[0] == 'activate' and len(args) == 2:
+        set_active(args[1])
+    elif args[0] == 'rollback':
+        rollback()
+    else:
+        print(usage)
@@ -0,0 +1,226 @@
+"""
+Solar Panel Fault Detection - Panel Tracking
+============================================
+Per-panel fault state merged across repeated surveys
+
+Each panel ID maps to one PanelState. A new detection for a known panel
+updates that state in place (O(1)) instead of adding another fault record,
+keeping a bounded history of confidences and class changes, so the fault
+table grows with the number of faulty panels rather than surveys.
+
+A No-Anomaly detection never opens or reopens a fault, whether recorded
+live or merged from an import. On a panel with an open fault it is recorded
+as the resolution: the fault type is kept, the change is logged in the class
+history and the fault is closed. New healthy panels are tracked as closed.
+"""
+
+from fault_catalog import HEALTHY_CLASS, CLOSED_STATUS
+from collections import deque
+from datetime import datetime
+import pandas as pd
+
+HISTORY_LENGTH = 10
+DATE_FORMAT = '%Y-%m-%d %H:%M'
+
+FAULT_TABLE_COLUMNS = [
+    'Panel ID', 'Fault Type', 'Severity', 'Detected', 'Assigned To', 'Status',
+    'Efficiency Loss', 'Last Seen', 'Detections', 'Confidence Trend', 'Class Changes',
+]
+
+
+class PanelState:
+    """Current fault and compact detection history for one panel"""
+
+    __slots__ = ('panel_id', 'fault_type', 'severity', 'efficiency_loss',
+                 'first_seen', 'last_seen', 'detections', 'confidences',
+                 'class_changes', 'assigned_to', 'status')
+
+    def __init__(self, panel_id, fault_type, severity, efficiency_loss, detected,
+                 confidence=None, assigned_to='Unassigned', status='New',
+                 history_length=HISTORY_LENGTH):
+        self.panel_id = panel_id
+        self.fault_type = fault_type
+        self.severity = severity
+        self.efficiency_loss = efficiency_loss
+        self.first_seen = detected
+        self.last_seen = detected
+        self.detections = 1
+        self.confidences = deque(maxlen=history_length)
+        self.class_changes = deque(maxlen=history_length)
+        self.assigned_to = assigned_to
+        self.status = status
+        if confidence is not None:
+            self.confidences.append(confidence)
+
+    @property
+    def confidence_trend(self):
+        """Change in confidence across the retained history, or None"""
+        if len(self.confidences) < 2:
+            return None
+        return self.confidences[-1] - self.confidences[0]
+
+    def change_class(self, when, fault_type, severity, efficiency_loss):
+        """Switch to a different fault class, logging the change"""
+        if fault_type != self.fault_type:
+            self.class_changes.append((when, self.fault_type, fault_type))
+            self.fault_type = fault_type
+            self.severity = severity
+            self.efficiency_loss = efficiency_loss
+
+    def resolve(self, when):
+        """Close an open fault after a No-Anomaly reading, keeping its type"""
+        if self.fault_type != HEALTHY_CLASS and self.status != CLOSED_STATUS:
+            self.class_changes.append((when, self.fault_type, HEALTHY_CLASS))
+            self.status = CLOSED_STATUS
+
+    def to_record(self):
+        trend = self.confidence_trend
+        return {
+            'Panel ID': self.panel_id,
+            'Fault Type': self.fault_type,
+            'Severity': self.severity,
+            'Detected': self.first_seen.strftime(DATE_FORMAT),
+            'Assigned To': self.assigned_to,
+            'Status': self.status,
+            'Efficiency Loss': self.efficiency_loss,
+            'Last Seen': self.last_seen.strftime(DATE_FORMAT),
+            'Detections': self.detections,
+            'Confidence Trend': '' if trend is None else f"{trend*100:+.1f}%",
+            'Class Changes': len(self.class_changes),
+        }
+
+
+class PanelTracker:
+    """
+    Panel ID -> PanelState store with O(1) incremental updates
+
+    Panels are kept in last-seen order (most recent last) by moving a panel
+    to the end of the dict whenever it is detected again. `revision` is
+    bumped on every change so derived views (the fault table) can be rebuilt
+    only when they are stale.
+    """
+
+    def __init__(self, history_length=HISTORY_LENGTH):
+        self.history_length = history_length
+        self.panels = {}
+        self.revision = 0
+        # Fingerprints of files whose records are already in the tracker
+        self.sources = set()
+
+    def __len__(self):
+        return len(self.panels)
+
+    def __contains__(self, panel_id):
+        return panel_id in self.panels
+
+    def get(self, panel_id):
+        return self.panels.get(panel_id)
+
+    def record(self, panel_id, fault_type, severity, efficiency_loss,
+               confidence=None, detected=None, assigned_to='Unassigned', status='New'):
+        """
+        Merge a detection into the panel's state
+
+        Args:
+            panel_id: Stable panel identifier
+            fault_type: Detected fault class
+            severity: Severity of the fault class
+            efficiency_loss: Efficiency loss of the fault class
+            confidence: Model confidence (0-1), if known
+            detected: Detection time, defaults to now
+            assigned_to: Technician for a newly tracked panel
+            status: Status for a newly tracked panel (a healthy panel is
+                tracked as closed)
+
+        Returns:
+            (PanelState, created) where created is True for a new panel
+        """
+        detected = detected or datetime.now()
+        state = self.panels.pop(panel_id, None)
+        self.revision += 1
+
+        healthy = fault_type == HEALTHY_CLASS
+
+        if state is None:
+            state = PanelState(panel_id, fault_type, severity, efficiency_loss, detected,
+                               confidence, assigned_to, CLOSED_STATUS if healthy else status,
+                               self.history_length)
+            self.panels[panel_id] = state
+            return state, True
+
+        if detected < state.first_seen:
+            state.first_seen = detected
+        if detected > state.last_seen:
+            state.last_seen = detected
+        state.detections += 1
+        if confidence is not None:
+            state.confidences.append(confidence)
+
+        if healthy:
+            state.resolve(detected)
+        else:
+            state.change_class(detected, fault_type, severity, efficiency_loss)
+            # A fault seen again after being closed needs attention again
+            if state.status == CLOSED_STATUS:
+                state.status = 'New'
+
+        self.panels[panel_id] = state
+        return state, False
+
+    def merge(self, panel_id, fault_type, severity, efficiency_loss, first_seen, last_seen,
+              detections=1, assigned_to='Unassigned', status='New'):
+        """
+        Merge an already-aggregated block of detections (e.g. a bulk import)
+
+        Counts and the seen-range are always combined, so the result doesn't
+        depend on the order blocks arrive in. The block's fault type,
+        assignment and status win only when it is newer than what is
+        tracked; older history just extends the record. A newer No-Anomaly
+        block resolves an open fault as in record(). Re-imports of the same
+        file are caught by their source fingerprint (see `sources`).
+        """
+        state = self.panels.get(panel_id)
+        self.revision += 1
+        healthy = fault_type == HEALTHY_CLASS
+
+        if state is None:
+            state = PanelState(panel_id, fault_type, severity, efficiency_loss, first_seen,
+                               assigned_to=assigned_to, status=CLOSED_STATUS if healthy else status,
+                               history_length=self.history_length)
+            state.last_seen = last_seen
+            state.detections = detections
+            self.panels[panel_id] = state
+            return state, True
+
+        state.first_seen = min(state.first_seen, first_seen)
+        state.detections += detections
+        if last_seen <= state.last_seen:
+            return state, False
+
+        # Newer block: it becomes the current state and moves to the end
+        del self.panels[panel_id]
+        state.last_seen = last_seen
+        if healthy:
+            state.resolve(last_seen)
+        else:
+            state.change_class(last_seen, fault_type, severity, efficiency_loss)
+            state.assigned_to = assigned_to
+            state.status = status
+
+        self.panels[panel_id] = state
+        return state, False
+
+    def set_assignment(self, panel_id, assigned_to=None, status=None):
+        """Update technician and/or status of a tracked panel"""
+        state = self.panels[panel_id]
+        self.revision += 1
+        if assigned_to is not None:
+            state.assigned_to = assigned_to
+        if status is not None:
+            state.status = status
+        return state
+
+    def to_dataframe(self):
+        """Fault table, one row per panel, most recently seen first"""
+        records = [state.to_record() for state in reversed(self.panels.values())]
+        return pd.DataFrame(records, columns=FAULT_TABLE_COLUMNS)
@@ -5,26 +5,38 @@ Make predictions on thermal images
 """
 
 from ultralytics import YOLO
-import sys
+from model_registry import resolve_model_path, active_version
+from instrumentation import timer, record_speed, observe_batch, inc, configure_from_env
+from datetime import date
+import numpy as np
+import argparse
 
-def predict_image(image_path, model_path='runs/classify/solar_fault_detection/weights/best.pt'):
+def predict_image(image_path, model_path=None):
     """
     Predict fault type for a thermal image
     
     Args:
         image_path: Path to thermal image
-        model_path: Path to trained model
+        model_path: Path to trained model, defaults to the active registry version
     """
     
+    model_path = model_path or resolve_model_path()
     print(f"🔮 Loading model from: {model_path}")
-    model = YOLO(model_path)
+    with timer('model_load'):
+        model = YOLO(model_path)
     
     print(f"📸 Analyzing image: {image_path}")
-    results = model.predict(
-        source=image_path,
-        save=True,
-        conf=0.5,
-    )
+    with timer('predict'):
+        results = model.predict(
+            source=image_path,
+            save=True,
+            conf=0.5,
+        )
+    
+    for result in results:
+        record_speed(result.speed)
+    observe_batch(len(results))
+    inc('images_processed', len(results))
     
     # Get top prediction
     top_class = results[0].names[results[0].probs.top1]
@@ -35,9 +47,93 @@ def predict_image(image_path, model_path='runs/classify/solar_fault_detection/we
     
     return results
 
+def predict_batch(source, output_dir, site='unknown', survey_date=None,
+                  model_path=None, row_group_size=50_000,
+                  index_dir=None, dedup_threshold=None):
+    """
+    Predict every image in a source and stream results to partitioned Parquet
+    
+    Args:
+        source: Image file, directory or glob
+        output_dir: Parquet dataset root (partitioned by survey_date/site)
+        site: Site label for the partition
+        survey_date: Survey date (YYYY-MM-DD), defaults to today
+        model_path: Path to trained model, defaults to the active registry version
+        row_group_size: Rows per Parquet row group
+        index_dir: Embedding index to add penultimate-layer embeddings to
+        dedup_threshold: Skip images at least this cosine-similar to one
+            already indexed (requires index_dir)
+    """
+    from prediction_export import PredictionWriter, prediction_row, class_names_from
+    from contextlib import nullcontext
+    
+    model_version = None if model_path else active_version()
+    model_path = model_path or resolve_model_path()
+    survey_date = survey_date or date.today().isoformat()
+    
+    print(f"🔮 Loading model from: {model_path}")
+    with timer('model_load'):
+        model = YOLO(model_path)
+    
+    print(f"📸 Analyzing images: {source}")
+    index = extractor = None
+    if index_dir:
+        from embedding_index import EmbeddingIndex, EmbeddingExtractor
+        extractor = EmbeddingExtractor(model)
+        index = EmbeddingIndex(index_dir, dim=extractor.layer.in_features)
+        # Set up the predictor (and its GPU warmup pass) before the hook is
+        # attached, so the queue holds exactly one embedding per result
+        model.predict(np.zeros((224, 224, 3), dtype=np.uint8), verbose=False)
+    
+    duplicates = 0
+    writer = PredictionWriter(output_dir, class_names_from(model.names), row_group_size=row_group_size)
+    with writer, (extractor or nullcontext()):
+        # stream=True yields results one at a time instead of accumulating a list
+        for result in model.predict(source=source, stream=True, verbose=False):
+            record_speed(result.speed)
+            inc('images_processed')
+            row = prediction_row(result, model_version=model_version)
+            
+            if index is not None:
+                embedding = extractor.pop()
+                if len(extractor):
+                    raise RuntimeError("Embedding queue is out of step with prediction results")
+                if dedup_threshold is not None and index.is_duplicate(embedding, dedup_threshold):
+                    duplicates += 1
+                    inc('duplicates_skipped')
+                    continue
+                index.add(embedding, {
+                    'image_path': row['image_path'],
+                    'predicted_class': row['predicted_class'],
+                    'confidence': row['confidence'],
+                    'site': site,
+                    'survey_date': survey_date,
+                })
+            
+            writer.add(row, site, survey_date)
+    
+    print(f"\n✅ Wrote {writer.rows_written} predictions to: {output_dir}")
+    if duplicates:
+        print(f"   Skipped {duplicates} near-duplicate images")
+    return writer.rows_written
+
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python predict.py <image_path>")
-        print("Example: python predict.py data/images/test/Cell/1234.jpg")
+    parser = argparse.ArgumentParser(
+        description="Predict fault types for thermal images",
+        epilog="Example: python predict.py data/images/test/Cell/1234.jpg",
+    )
+    parser.add_argument('source', help="Image path, or directory/glob with --parquet")
+    parser.add_argument('--model', default=None, help="Weights path (default: active registry version)")
+    parser.add_argument('--parquet', metavar='DIR', help="Stream predictions to a partitioned Parquet dataset")
+    parser.add_argument('--site', default='unknown', help="Site partition for --parquet")
+    parser.add_argument('--date', default=None, help="Survey date partition for --parquet (YYYY-MM-DD)")
+    parser.add_argument('--index', metavar='DIR', help="Add embeddings to this similarity index (with --parquet)")
+    parser.add_argument('--dedup', type=float, metavar='SIM', help="Skip images this similar to an indexed one")
+    args = parser.parse_args()
+    
+    configure_from_env()
+    if args.parquet:
+        predict_batch(args.source, args.parquet, args.site, args.date, args.model,
+                      index_dir=args.index, dedup_threshold=args.dedup)
     else:
-        predict_image(sys.argv[1])
+        predict_image(args.source, args.model)
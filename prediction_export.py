@@ -0,0 +1,181 @@
+"""
+Solar Panel Fault Detection - Prediction Export
+===============================================
+Streams predictions into Hive-partitioned Parquet (survey_date=/site=)
+
+Each row keeps the full class probability vector as float16 next to the
+top-1 result, model version and per-image timing. Rows are buffered per
+partition and written out one row group at a time, so memory stays bounded
+by the row group size regardless of how many images are processed.
+"""
+
+from datetime import datetime, date
+from pathlib import Path
+import numpy as np
+import uuid
+import io
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = pq = None
+
+from instrumentation import timer, set_gauge
+
+PARTITION_COLS = ('survey_date', 'site')
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("Parquet export requires pyarrow: pip install pyarrow")
+
+
+def prediction_schema(class_names):
+    """Arrow schema for prediction rows (partition columns live in the path)"""
+    _require_pyarrow()
+    return pa.schema(
+        [
+            ('image_path', pa.string()),
+            ('predicted_class', pa.dictionary(pa.int32(), pa.string())),
+            ('confidence', pa.float32()),
+            ('probabilities', pa.list_(pa.float16(), len(class_names))),
+            ('model_version', pa.string()),
+            ('preprocess_ms', pa.float32()),
+            ('inference_ms', pa.float32()),
+            ('postprocess_ms', pa.float32()),
+            ('predicted_at', pa.timestamp('ms')),
+        ],
+        metadata={'class_names': ','.join(class_names)},
+    )
+
+
+def class_names_from(names):
+    """Ordered class list from an ultralytics `names` dict"""
+    return [names[i] for i in sorted(names)]
+
+
+def prediction_row(result, image_path=None, model_version=None):
+    """Flatten one ultralytics classification result into a row dict"""
+    probs = result.probs.data.float().cpu().numpy()
+    speed = result.speed or {}
+    return {
+        'image_path': str(image_path or result.path),
+        'predicted_class': result.names[int(probs.argmax())],
+        'confidence': float(probs.max()),
+        'probabilities': probs.astype(np.float16),
+        'model_version': model_version,
+        'preprocess_ms': speed.get('preprocess'),
+        'inference_ms': speed.get('inference'),
+        'postprocess_ms': speed.get('postprocess'),
+        'predicted_at': datetime.now(),
+    }
+
+
+def rows_to_table(rows, class_names):
+    """Build an Arrow table from row dicts, packing probabilities column-wise"""
+    schema = prediction_schema(class_names)
+    columns = {name: [row[name] for row in rows] for name in schema.names if name != 'probabilities'}
+
+    flat = np.stack([row['probabilities'] for row in rows]).astype(np.float16).ravel()
+    probabilities = pa.FixedSizeListArray.from_arrays(pa.array(flat, type=pa.float16()), len(class_names))
+
+    arrays = []
+    for field in schema:
+        if field.name == 'probabilities':
+            arrays.append(probabilities)
+        elif pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(columns[field.name], type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(columns[field.name], type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def to_parquet_bytes(rows, class_names):
+    """Serialize a handful of rows to an in-memory Parquet file"""
+    buffer = io.BytesIO()
+    pq.write_table(rows_to_table(rows, class_names), buffer, compression='zstd')
+    return buffer.getvalue()
+
+
+class PredictionWriter:
+    """
+    Streaming, partitioned Parquet writer for prediction rows
+
+    Args:
+        root: Output dataset directory
+        class_names: Ordered class names matching the probability vector
+        row_group_size: Rows buffered per partition before a row group is written
+        max_buffered_rows: Flush every partition once this many rows are pending
+        max_open_files: Open Parquet writers kept before the oldest is closed
+    """
+
+    def __init__(self, root, class_names, row_group_size=50_000,
+                 max_buffered_rows=200_000, max_open_files=64):
+        _require_pyarrow()
+        self.root = Path(root)
+        self.class_names = list(class_names)
+        self.schema = prediction_schema(self.class_names)
+        self.row_group_size = row_group_size
+        self.max_buffered_rows = max_buffered_rows
+        self.max_open_files = max_open_files
+        self.rows_written = 0
+        self._buffers = {}
+        self._writers = {}
+        self._buffered = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def add(self, row, site='unknown', survey_date=None):
+        """Queue a row produced by prediction_row"""
+        survey_date = survey_date or date.today().isoformat()
+        key = (str(survey_date), str(site))
+        buffer = self._buffers.setdefault(key, [])
+        buffer.append(row)
+        self._buffered += 1
+
+        if len(buffer) >= self.row_group_size:
+            self._flush(key)
+        elif self._buffered >= self.max_buffered_rows:
+            self.flush()
+        set_gauge('export_queue_depth', self._buffered)
+
+    def _writer(self, key):
+        writer = self._writers.pop(key, None)
+        if writer is None:
+            if len(self._writers) >= self.max_open_files:
+                oldest = next(iter(self._writers))
+                self._writers.pop(oldest).close()
+            part_dir = self.root.joinpath(*(f"{col}={val}" for col, val in zip(PARTITION_COLS, key)))
+            part_dir.mkdir(parents=True, exist_ok=True)
+            writer = pq.ParquetWriter(part_dir / f"part-{uuid.uuid4().hex}.parquet",
+                                      self.schema, compression='zstd')
+        # Re-insert to keep the dict ordered by most recent use
+        self._writers[key] = writer
+        return writer
+
+    def _flush(self, key):
+        rows = self._buffers.pop(key, None)
+        if not rows:
+            return
+        with timer('export'):
+            self._writer(key).write_table(rows_to_table(rows, self.class_names))
+        self._buffered -= len(rows)
+        self.rows_written += len(rows)
+
+    def flush(self):
+        """Write every pending partition buffer as a row group"""
+        for key in list(self._buffers):
+            self._flush(key)
+
+    def close(self):
+        self.flush()
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+        set_gauge('export_queue_depth', 0)
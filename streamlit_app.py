@@ -5,12 +5,22 @@ Simple fault detection and management
 """
 
 import streamlit as st
-from ultralytics import YOLO
 from PIL import Image
-import pandas as pd
 from datetime import datetime, timedelta
 from pathlib import Path
-import random
+import time
+
+from model_registry import ModelServer, load_registry
+import instrumentation
+from instrumentation import timer, observe, record_speed, observe_batch, inc
+from prediction_export import prediction_row, to_parquet_bytes, class_names_from
+from embedding_index import (EmbeddingIndex, EmbeddingExtractor, DEFAULT_INDEX_DIR,
+                             image_digest, save_thumbnail)
+from panel_tracking import PanelTracker
+from fault_catalog import FAULT_INFO, SEVERITY_LEVELS, STATUSES, CLOSED_STATUS, UNASSIGNED, TECHNICIANS
+from dispatch import DispatchEngine
+from fault_io import import_faults, export_faults
+import io
 
 # Page config
 st.set_page_config(
@@ -244,46 +254,70 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Fault info
-FAULT_INFO = {
-    'Cell': {'severity': 'High', 'icon': '⚡', 'loss': '5-15%', 'action': 'Inspect cell, check connections'},
-    'Cell-Multi': {'severity': 'Critical', 'icon': '🔥', 'loss': '20-40%', 'action': 'Replace module immediately'},
-    'Cracking': {'severity': 'Medium', 'icon': '💔', 'loss': '3-10%', 'action': 'Monitor and schedule replacement'},
-    'Diode': {'severity': 'High', 'icon': '⚙️', 'loss': '10-25%', 'action': 'Replace bypass diode'},
-    'Diode-Multi': {'severity': 'Critical', 'icon': '🚨', 'loss': '30-50%', 'action': 'Emergency diode replacement'},
-    'Hot-Spot': {'severity': 'High', 'icon': '🔥', 'loss': '15-30%', 'action': 'Check for shading, replace if needed'},
-    'Hot-Spot-Multi': {'severity': 'Critical', 'icon': '🚨', 'loss': '40-70%', 'action': 'URGENT: Disconnect and replace'},
-    'No-Anomaly': {'severity': 'Low', 'icon': '✅', 'loss': '0%', 'action': 'Continue routine monitoring'},
-    'Offline-Module': {'severity': 'Critical', 'icon': '⚠️', 'loss': '100%', 'action': 'Check connections, test output'},
-    'Shadowing': {'severity': 'Medium', 'icon': '🌳', 'loss': '10-30%', 'action': 'Remove shading source'},
-    'Soiling': {'severity': 'Low', 'icon': '🧹', 'loss': '2-8%', 'action': 'Clean panels'},
-    'Vegetation': {'severity': 'Medium', 'icon': '🌱', 'loss': '5-20%', 'action': 'Remove vegetation'}
-}
+@st.cache_resource
+def start_metrics():
+    return instrumentation.configure_from_env()
 
 @st.cache_resource
+def get_model_server():
+    inc('model_cache_misses')
+    with timer('model_load'):
+        return ModelServer()
+
 def load_model():
-    try:
-        return YOLO('runs/classify/solar_fault_detection/weights/best.pt')
-    except:
-        return None
+    inc('model_cache_lookups')
+    return get_model_server().model
+
+@st.cache_resource
+def get_embedding_index(dim):
+    return EmbeddingIndex(DEFAULT_INDEX_DIR, dim=dim)
 
-# Initialize fault database
-if 'fault_database' not in st.session_state:
-    st.session_state.fault_database = pd.DataFrame({
-        'Panel ID': ['A-125', 'B-087', 'C-234', 'A-089', 'D-156'],
-        'Fault Type': ['Hot-Spot', 'Cell', 'Diode', 'Cracking', 'Soiling'],
-        'Severity': ['High', 'High', 'Medium', 'Medium', 'Low'],
-        'Detected': [
-            (datetime.now() - timedelta(hours=2)).strftime('%Y-%m-%d %H:%M'),
-            (datetime.now() - timedelta(hours=5)).strftime('%Y-%m-%d %H:%M'),
-            (datetime.now() - timedelta(hours=8)).strftime('%Y-%m-%d %H:%M'),
-            (datetime.now() - timedelta(hours=10)).strftime('%Y-%m-%d %H:%M'),
-            (datetime.now() - timedelta(hours=12)).strftime('%Y-%m-%d %H:%M')
-        ],
-        'Assigned To': ['John Smith', 'Sarah Johnson', 'Mike Chen', 'John Smith', 'Sarah Johnson'],
-        'Status': ['In Progress', 'Pending', 'Assigned', 'Completed', 'Pending'],
-        'Efficiency Loss': ['15-30%', '5-15%', '10-25%', '3-10%', '2-8%']
-    })
+start_metrics()
+
+def build_dispatch_engine(tracker):
+    """Dispatch queue holding every open fault in the tracker"""
+    engine = DispatchEngine(TECHNICIANS)
+    for state in tracker.panels.values():
+        if state.status != CLOSED_STATUS:
+            engine.add_fault(state.panel_id, state.severity, state.efficiency_loss,
+                             state.first_seen, state.assigned_to, state.fault_type)
+    return engine
+
+# Initialize fault database (one tracked state per panel, table derived from it)
+if 'panel_tracker' not in st.session_state:
+    tracker = PanelTracker()
+    seed_faults = [
+        ('D-156', 'Soiling', 'Low', '2-8%', 12, 'Sarah Johnson', 'Pending'),
+        ('A-089', 'Cracking', 'Medium', '3-10%', 10, 'John Smith', 'Completed'),
+        ('C-234', 'Diode', 'Medium', '10-25%', 8, 'Mike Chen', 'Assigned'),
+        ('B-087', 'Cell', 'High', '5-15%', 5, 'Sarah Johnson', 'Pending'),
+        ('A-125', 'Hot-Spot', 'High', '15-30%', 2, 'John Smith', 'In Progress'),
+    ]
+    for panel_id, fault_type, severity, loss, hours_ago, assigned_to, status in seed_faults:
+        tracker.record(panel_id, fault_type, severity, loss,
+                       detected=datetime.now() - timedelta(hours=hours_ago),
+                       assigned_to=assigned_to, status=status)
+    st.session_state.panel_tracker = tracker
+    
+    st.session_state.dispatch_engine = build_dispatch_engine(tracker)
+
+def fault_table():
+    """Fault table for display, rebuilt only when the tracker has changed since"""
+    tracker = st.session_state.panel_tracker
+    cached = st.session_state.get('fault_table')
+    if cached is None or cached[0] != tracker.revision:
+        cached = (tracker.revision, tracker.to_dataframe())
+        st.session_state.fault_table = cached
+    return cached[1]
+
+def sync_dispatch(state):
+    """Mirror a panel's current fault state into the dispatch queue"""
+    engine = st.session_state.dispatch_engine
+    if state.status == CLOSED_STATUS:
+        engine.close_fault(state.panel_id)
+    else:
+        engine.add_fault(state.panel_id, state.severity, state.efficiency_loss,
+                         state.first_seen, state.assigned_to, state.fault_type)
 
 # Sidebar Navigation
 with st.sidebar:
@@ -304,10 +338,40 @@ with st.sidebar:
     **Classes:** 12 fault types
     """)
     
+    st.markdown("### 📦 Model Version")
+    server = get_model_server()
+    registry = load_registry()
+    st.caption(f"Serving: {server.version or 'default weights'}")
+    
+    if server.loading:
+        st.warning("🔄 Loading new model version...")
+    elif server.last_error is not None:
+        st.error(f"Model swap failed: {server.last_error}")
+    
+    if registry['versions']:
+        versions = list(registry['versions'])
+        selected_version = st.selectbox(
+            "Registered Versions",
+            versions,
+            index=versions.index(server.version) if server.version in versions else 0,
+            key="model_version_selector"
+        )
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("Activate", disabled=server.loading or selected_version == server.version):
+                server.swap(selected_version)
+                st.rerun()
+        with col2:
+            if st.button("Rollback", disabled=server.loading or not registry['history']):
+                server.rollback()
+                st.rerun()
+    
     st.markdown("---")
     st.markdown("### 📞 Quick Stats")
-    total = len(st.session_state.fault_database)
-    active = len(st.session_state.fault_database[st.session_state.fault_database['Status'] != 'Completed'])
+    # O(1) counts: open faults are exactly what the dispatch engine holds
+    total = len(st.session_state.panel_tracker)
+    active = len(st.session_state.dispatch_engine)
     st.metric("Total Faults", total)
     st.metric("Active", active)
 
@@ -358,10 +422,18 @@ if page == "🔍 Analyze Image":
     image_to_process = None
     
     if uploaded_file is not None:
-        image_to_process = Image.open(uploaded_file)
+        # Streamlit has the upload in memory by the time the script reruns, so
+        # opening and decoding it is the whole cost and is timed as 'decode'
+        with timer('decode'):
+            image_to_process = Image.open(uploaded_file)
+            image_to_process.load()
+        image_hash = image_digest(uploaded_file.getvalue())
         st.success("✅ Image uploaded successfully!")
     elif selected_sample is not None:
-        image_to_process = Image.open(selected_sample)
+        with timer('decode'):
+            image_to_process = Image.open(selected_sample)
+            image_to_process.load()
+        image_hash = image_digest(selected_sample.read_bytes())
         st.info(f"📸 Using sample: {selected_sample.name}")
     
     if image_to_process is not None:
@@ -369,7 +441,19 @@ if page == "🔍 Analyze Image":
         
         if model:
             with st.spinner('🔄 Analyzing thermal image...'):
-                results = model.predict(image_to_process, verbose=False)
+                # The cached model is shared by every session; hold the server's
+                # predict lock so no other request runs through our hook
+                with get_model_server().predict_lock, timer('predict'), \
+                        EmbeddingExtractor(model) as extractor:
+                    results = model.predict(image_to_process, verbose=False)
+                    embedding = extractor.pop()
+            
+            embedding_index = get_embedding_index(len(embedding))
+            
+            record_speed(results[0].speed)
+            observe_batch(1)
+            inc('images_processed')
+            render_start = time.perf_counter()
             
             top_idx = results[0].probs.top1
             top_class = results[0].names[top_idx]
@@ -432,6 +516,23 @@ if page == "🔍 Analyze Image":
                 st.write(f"• **Recommended Action:** {info['action']}")
                 st.write(f"• **Icon:** {info['icon']}")
             
+            # Similar past cases from the embedding index
+            similar = embedding_index.query(embedding, k=5, exclude_digest=image_hash)
+            if similar:
+                st.markdown("---")
+                st.markdown("### 🔎 Similar Faults")
+                
+                cols = st.columns(len(similar))
+                for col, (similarity, case) in zip(cols, similar):
+                    with col:
+                        case_path = Path(case['image_path'])
+                        if case_path.exists():
+                            st.image(Image.open(case_path), use_container_width=True)
+                        st.write(f"**{case['predicted_class']}**")
+                        st.caption(f"Similarity: {similarity*100:.1f}% · {case.get('source', case_path.name)}")
+            
+            observe('render', time.perf_counter() - render_start)
+            
             # Actions (Confidence Distribution section REMOVED)
             st.markdown("---")
             
@@ -460,20 +561,50 @@ Action: {info['action']}
                     f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
                     use_container_width=True
                 )
+                
+                try:
+                    parquet_report = to_parquet_bytes(
+                        [prediction_row(results[0], image_path=getattr(uploaded_file, 'name', selected_sample),
+                                        model_version=get_model_server().version)],
+                        class_names_from(results[0].names)
+                    )
+                    st.download_button(
+                        "📦 Download Parquet",
+                        parquet_report,
+                        f"prediction_{datetime.now().strftime('%Y%m%d_%H%M%S')}.parquet",
+                        use_container_width=True
+                    )
+                except ImportError:
+                    pass
             
             with col2:
+                panel_id = st.text_input("🏷️ Panel ID", placeholder="e.g. A-125", key="panel_id_input").strip()
+                
                 if st.button("➕ Add to Database", use_container_width=True):
-                    new_fault = pd.DataFrame({
-                        'Panel ID': [f"{random.choice(['A', 'B', 'C', 'D'])}-{random.randint(100, 999)}"],
-                        'Fault Type': [top_class],
-                        'Severity': [info['severity']],
-                        'Detected': [datetime.now().strftime('%Y-%m-%d %H:%M')],
-                        'Assigned To': ['Unassigned'],
-                        'Status': ['New'],
-                        'Efficiency Loss': [info['loss']]
-                    })
-                    st.session_state.fault_database = pd.concat([new_fault, st.session_state.fault_database], ignore_index=True)
-                    st.success("✅ Added to database!")
+                    if not panel_id:
+                        st.warning("Enter the panel ID to track this detection")
+                    else:
+                        state, created = st.session_state.panel_tracker.record(
+                            panel_id, top_class, info['severity'], info['loss'], confidence=top_conf
+                        )
+                        sync_dispatch(state)
+                        # Uploads only exist in memory; keep a thumbnail for the gallery
+                        if uploaded_file is not None:
+                            image_path = save_thumbnail(image_to_process, image_hash, DEFAULT_INDEX_DIR)
+                        else:
+                            image_path = selected_sample
+                        embedding_index.add(embedding, {
+                            'image_path': str(image_path),
+                            'image_digest': image_hash,
+                            'source': getattr(uploaded_file, 'name', None) or selected_sample.name,
+                            'predicted_class': top_class,
+                            'confidence': top_conf,
+                            'panel_id': panel_id,
+                        })
+                        if created:
+                            st.success("✅ Added to database!")
+                        else:
+                            st.success(f"✅ Updated {panel_id} (seen {state.detections} times)")
             
             with col3:
                 if st.button("🔄 Analyze Another", use_container_width=True):
@@ -491,23 +622,91 @@ elif page == "📋 Fault Management":
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        filter_status = st.selectbox("🔍 Filter by Status", ["All", "New", "Assigned", "In Progress", "Pending", "Completed"])
+        filter_status = st.selectbox("🔍 Filter by Status", ["All"] + STATUSES)
     
     with col2:
-        filter_severity = st.selectbox("⚠️ Filter by Severity", ["All", "Critical", "High", "Medium", "Low"])
+        filter_severity = st.selectbox("⚠️ Filter by Severity", ["All"] + SEVERITY_LEVELS)
     
     with col3:
-        filter_assigned = st.selectbox("👤 Filter by Technician", 
-                                       ["All", "Unassigned", "John Smith", "Sarah Johnson", "Mike Chen", "Emma Davis"])
+        filter_assigned = st.selectbox("👤 Filter by Technician", ["All", UNASSIGNED] + TECHNICIANS)
     
     with col4:
         if st.button("🔄 Refresh Data", use_container_width=True):
             st.rerun()
     
+    # Dispatch: most urgent unassigned faults go to the least-loaded technicians
+    engine = st.session_state.dispatch_engine
+    col1, col2 = st.columns([3, 1])
+    
+    with col1:
+        next_up = engine.pending(3)
+        st.markdown(f"**🚚 Dispatch queue:** {engine.pending_count} unassigned open faults"
+                    + (f" · next: {', '.join(next_up)}" if next_up else ""))
+    
+    with col2:
+        if st.button("🤖 Auto-Assign", use_container_width=True, disabled=engine.pending_count == 0):
+            for panel_id, technician in engine.auto_assign():
+                st.session_state.panel_tracker.set_assignment(panel_id, technician, 'Assigned')
+            st.rerun()
+    
+    # Bulk import/export of historical inspection records
+    with st.expander("📦 Bulk Import / Export", expanded=False):
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            bulk_file = st.file_uploader("Import fault records (CSV or Parquet)", type=['csv', 'parquet'],
+                                         key="bulk_import")
+            st.caption("Older records extend each panel's history. A file already imported "
+                       "or exported here is skipped, so detections aren't counted twice.")
+            if bulk_file is not None and st.button("📥 Import Records", use_container_width=True):
+                try:
+                    with st.spinner("Importing records..."):
+                        summary = import_faults(bulk_file, st.session_state.panel_tracker)
+                except ValueError as e:
+                    st.error(f"Import failed: {e}")
+                else:
+                    st.session_state.dispatch_engine = build_dispatch_engine(st.session_state.panel_tracker)
+                    # Keep the summary across the rerun that redraws the queue and table
+                    st.session_state.import_summary = summary
+                    st.rerun()
+            
+            summary = st.session_state.pop('import_summary', None)
+            if summary is not None:
+                st.success(f"✅ Merged {summary['rows_merged']:,} of {summary['rows_read']:,} rows "
+                           f"({summary['panels_created']:,} new panels)")
+                if summary['rows_skipped']:
+                    st.info(f"{summary['rows_skipped']:,} rows skipped: this file was already imported")
+                if summary['rows_rejected']:
+                    st.warning(f"{summary['rows_rejected']:,} rows rejected by validation")
+        
+        with col2:
+            export_format = st.selectbox("Export format", ["csv", "parquet"], key="bulk_export_format")
+            # Serialising every record is only worth it when asked for, not on each rerun
+            if st.button("🗂️ Prepare Export", use_container_width=True):
+                buffer = io.BytesIO()
+                try:
+                    with st.spinner("Exporting records..."):
+                        rows = export_faults(st.session_state.panel_tracker, buffer, fmt=export_format)
+                except ImportError as e:
+                    st.error(str(e))
+                else:
+                    st.session_state.fault_export = (export_format, datetime.now(), rows, buffer.getvalue())
+            
+            export = st.session_state.get('fault_export')
+            if export is not None and export[0] == export_format:
+                _, exported_at, rows, data = export
+                st.download_button(
+                    "📤 Download Fault Records",
+                    data,
+                    f"faults_{exported_at.strftime('%Y%m%d_%H%M%S')}.{export_format}",
+                    use_container_width=True
+                )
+                st.caption(f"{rows:,} records as of {exported_at.strftime('%Y-%m-%d %H:%M:%S')}")
+    
     st.markdown("---")
     
     # Filter data
-    filtered_df = st.session_state.fault_database.copy()
+    filtered_df = fault_table().copy()
     
     if filter_status != "All":
         filtered_df = filtered_df[filtered_df['Status'] == filter_status]
@@ -544,7 +743,8 @@ elif page == "📋 Fault Management":
     if len(filtered_df) == 0:
         st.info("No faults match the selected filters")
     else:
-        for idx, row in filtered_df.iterrows():
+        for _, row in filtered_df.iterrows():
+            panel_id = row['Panel ID']
             with st.expander(f"📍 **{row['Panel ID']}** - {FAULT_INFO[row['Fault Type']]['icon']} {row['Fault Type']} ({row['Severity']})", expanded=False):
                 col1, col2 = st.columns(2)
                 
@@ -555,6 +755,13 @@ elif page == "📋 Fault Management":
                     st.write(f"• **Severity:** {row['Severity']}")
                     st.write(f"• **Efficiency Loss:** {row['Efficiency Loss']}")
                     st.write(f"• **Detected:** {row['Detected']}")
+                    st.write(f"• **Last Seen:** {row['Last Seen']} ({row['Detections']} detections)")
+                    if row['Confidence Trend']:
+                        st.write(f"• **Confidence Trend:** {row['Confidence Trend']}")
+                    
+                    state = st.session_state.panel_tracker.get(panel_id)
+                    for detected, old_type, new_type in state.class_changes:
+                        st.caption(f"{detected.strftime('%Y-%m-%d %H:%M')}: {old_type} → {new_type}")
                 
                 with col2:
                     st.markdown("**Assignment & Status:**")
@@ -562,21 +769,21 @@ elif page == "📋 Fault Management":
                     # Editable fields
                     new_assigned = st.selectbox(
                         "👤 Assign Technician:",
-                        ["Unassigned", "John Smith", "Sarah Johnson", "Mike Chen", "Emma Davis"],
-                        index=["Unassigned", "John Smith", "Sarah Johnson", "Mike Chen", "Emma Davis"].index(row['Assigned To']),
-                        key=f"assign_{idx}"
+                        [UNASSIGNED] + TECHNICIANS,
+                        index=([UNASSIGNED] + TECHNICIANS).index(row['Assigned To']),
+                        key=f"assign_{panel_id}"
                     )
                     
                     new_status = st.selectbox(
                         "📊 Update Status:",
-                        ["New", "Assigned", "In Progress", "Pending", "Completed"],
-                        index=["New", "Assigned", "In Progress", "Pending", "Completed"].index(row['Status']),
-                        key=f"status_{idx}"
+                        STATUSES,
+                        index=STATUSES.index(row['Status']),
+                        key=f"status_{panel_id}"
                     )
                     
-                    if st.button("💾 Save Changes", key=f"save_{idx}"):
-                        st.session_state.fault_database.at[idx, 'Assigned To'] = new_assigned
-                        st.session_state.fault_database.at[idx, 'Status'] = new_status
+                    if st.button("💾 Save Changes", key=f"save_{panel_id}"):
+                        state = st.session_state.panel_tracker.set_assignment(panel_id, new_assigned, new_status)
+                        sync_dispatch(state)
                         st.success("✅ Updated!")
                         st.rerun()
 
@@ -591,7 +798,7 @@ elif page == "📊 System Overview":
     # Key metrics
     col1, col2, col3, col4 = st.columns(4)
     
-    df = st.session_state.fault_database
+    df = fault_table()
     
     with col1:
         st.markdown("""
@@ -16,8 +16,49 @@ Dataset:
 
 from ultralytics import YOLO
 import torch
+import torch.nn.functional as F
 from datetime import datetime
 from pathlib import Path
+from copy import deepcopy
+import argparse
+
+# Training configuration (individual keys can be overridden per run)
+TRAIN_CONFIG = dict(
+    epochs=100,
+    imgsz=224,
+    batch=32,
+    
+    # Optimization
+    optimizer='AdamW',
+    lr0=0.001,
+    lrf=0.01,
+    momentum=0.937,
+    weight_decay=0.0005,
+    
+    # Data augmentation
+    hsv_h=0.015,
+    hsv_s=0.7,
+    hsv_v=0.4,
+    degrees=10.0,
+    translate=0.1,
+    scale=0.5,
+    fliplr=0.5,
+    
+    # Training settings
+    patience=15,  # Early stopping patience
+    save=True,
+    save_period=10,  # Save checkpoint every 10 epochs
+    
+    # Logging
+    project='runs/classify',
+    name='solar_fault_detection',
+    exist_ok=True,
+    verbose=True,
+    
+    # Performance
+    workers=4,
+    amp=True,  # Automatic Mixed Precision
+)
 
 def setup_directories():
     """Create necessary directories for training outputs"""
@@ -38,8 +79,13 @@ def check_gpu():
         print("⚠️  No GPU detected, training on CPU (will be slow)")
         return False
 
-def train_model():
-    """Main training function for YOLOv8 classification model"""
+def train_model(overrides=None):
+    """
+    Main training function for YOLOv8 classification model
+    
+    Args:
+        overrides: Dict of TRAIN_CONFIG keys to replace for this run
+    """
     
     # Setup
     setup_directories()
@@ -64,58 +110,166 @@ def train_model():
     print(f"   Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
     # Training configuration
-    results = model.train(
-        data='data/images',
-        epochs=100,
-        imgsz=224,
-        batch=32,
-        device=0 if has_gpu else 'cpu',
-        
-        # Optimization
-        optimizer='AdamW',
-        lr0=0.001,
-        lrf=0.01,
-        momentum=0.937,
-        weight_decay=0.0005,
-        
-        # Data augmentation
-        hsv_h=0.015,
-        hsv_s=0.7,
-        hsv_v=0.4,
-        degrees=10.0,
-        translate=0.1,
-        scale=0.5,
-        fliplr=0.5,
+    config = {**TRAIN_CONFIG, 'device': 0 if has_gpu else 'cpu', **(overrides or {})}
+    results = model.train(data='data/images', **config)
+    
+    print("\n✅ Training Complete!")
+    print(f"   Best model saved at: {Path(config['project']) / config['name'] / 'weights' / 'best.pt'}")
+    
+    return model, results
+
+def build_student(num_classes, width=0.125, depth=0.33):
+    """YOLOv8-cls network with a reduced width/depth multiple"""
+    from ultralytics.nn.tasks import ClassificationModel, yaml_model_load
+    
+    cfg = yaml_model_load('yolov8n-cls.yaml')
+    cfg['scales'] = {cfg.get('scale') or 'n': [depth, width, 1024]}
+    return ClassificationModel(cfg, nc=num_classes, verbose=False)
+
+def _distill_loader(split, imgsz, batch, train, workers):
+    from torchvision import datasets, transforms
+    
+    steps = [transforms.Resize(imgsz), transforms.CenterCrop(imgsz)]
+    if train:
+        steps.append(transforms.RandomHorizontalFlip())
+    steps.append(transforms.ToTensor())
+    dataset = datasets.ImageFolder(Path('data/images') / split, transforms.Compose(steps))
+    return torch.utils.data.DataLoader(dataset, batch_size=batch, shuffle=train,
+                                       num_workers=workers, pin_memory=torch.cuda.is_available())
+
+def distill_model(teacher_path='best.pt', width=0.125, imgsz=160, teacher_imgsz=224,
+                  epochs=50, batch=64, lr0=0.001, temperature=4.0, alpha=0.7,
+                  name='solar_fault_student', accuracy_floor=None):
+    """
+    Distill the teacher model into a narrower, lower-resolution student
+    
+    Args:
+        teacher_path: Trained teacher weights
+        width: Student width multiple (yolov8n-cls uses 0.25)
+        imgsz: Student input size
+        teacher_imgsz: Teacher input size
+        epochs: Training epochs
+        batch: Batch size
+        lr0: AdamW learning rate
+        temperature: Softmax temperature for the soft-label loss
+        alpha: Weight of the soft-label loss versus hard-label cross-entropy
+        name: Run name under runs/classify
+        accuracy_floor: Minimum acceptable student top-1 for the final report
+    """
+    from evaluate import compare_checkpoints
+    
+    setup_directories()
+    device = torch.device('cuda:0' if check_gpu() else 'cpu')
+    save_dir = Path(TRAIN_CONFIG['project']) / name / 'weights'
+    save_dir.mkdir(parents=True, exist_ok=True)
+    
+    train_loader = _distill_loader('train', teacher_imgsz, batch, True, TRAIN_CONFIG['workers'])
+    val_loader = _distill_loader('val', teacher_imgsz, batch, False, TRAIN_CONFIG['workers'])
+    class_names = train_loader.dataset.classes
+    
+    teacher = YOLO(teacher_path).model.float().to(device).eval()
+    name_to_idx = {n: i for i, n in teacher.names.items()}
+    teacher_order = torch.tensor([name_to_idx[n] for n in class_names], device=device)
+    # The head applies softmax in eval mode; capture the logits feeding it
+    teacher_logits = {}
+    teacher.model[-1].linear.register_forward_hook(lambda m, i, o: teacher_logits.update(out=o))
+    
+    student = build_student(len(class_names), width).to(device)
+    student.names = dict(enumerate(class_names))
+    optimizer = torch.optim.AdamW(student.parameters(), lr=lr0, weight_decay=TRAIN_CONFIG['weight_decay'])
+    scheduler = torch.optim.lr_scheduler.CosineAnnealingLR(optimizer, epochs)
+    
+    print(f"\n🎓 Distilling {teacher_path} -> width {width} @ {imgsz}px")
+    print(f"   Teacher params: {sum(p.numel() for p in teacher.parameters()):,}")
+    print(f"   Student params: {sum(p.numel() for p in student.parameters()):,}")
+    
+    def student_input(x):
+        return F.interpolate(x, size=(imgsz, imgsz), mode='bilinear', align_corners=False, antialias=True)
+    
+    best_top1 = -1.0
+    for epoch in range(epochs):
+        student.train()
+        total_loss = 0.0
+        for x, y in train_loader:
+            x, y = x.to(device, non_blocking=True), y.to(device, non_blocking=True)
+            with torch.no_grad():
+                teacher(x)
+                soft_targets = F.softmax(teacher_logits['out'][:, teacher_order] / temperature, dim=1)
+            
+            logits = student(student_input(x))
+            soft_loss = F.kl_div(F.log_softmax(logits / temperature, dim=1), soft_targets,
+                                 reduction='batchmean') * temperature ** 2
+            loss = alpha * soft_loss + (1 - alpha) * F.cross_entropy(logits, y)
+            
+            optimizer.zero_grad(set_to_none=True)
+            loss.backward()
+            optimizer.step()
+            total_loss += loss.item() * len(x)
+        scheduler.step()
         
-        # Training settings
-        patience=15,  # Early stopping patience
-        save=True,
-        save_period=10,  # Save checkpoint every 10 epochs
+        student.eval()
+        correct = seen = 0
+        with torch.no_grad():
+            for x, y in val_loader:
+                x, y = x.to(device), y.to(device)
+                correct += (student(student_input(x)).argmax(1) == y).sum().item()
+                seen += len(y)
+        top1 = correct / max(seen, 1)
         
-        # Logging
-        project='runs/classify',
-        name='solar_fault_detection',
-        exist_ok=True,
-        verbose=True,
+        print(f"   Epoch {epoch + 1}/{epochs}: loss={total_loss / len(train_loader.dataset):.4f} val_top1={top1:.4f}")
         
-        # Performance
-        workers=4,
-        amp=True,  # Automatic Mixed Precision
-    )
+        # Same checkpoint layout as ultralytics so YOLO(path) can load it
+        ckpt = {
+            'epoch': epoch,
+            'best_fitness': max(top1, best_top1),
+            'model': deepcopy(student).half(),
+            'ema': None,
+            'train_args': {'task': 'classify', 'imgsz': imgsz, 'data': 'data/images', 'epochs': epochs,
+                           'batch': batch, 'lr0': lr0, 'teacher': str(teacher_path),
+                           'width': width, 'temperature': temperature, 'alpha': alpha},
+            'date': datetime.now().isoformat(),
+        }
+        torch.save(ckpt, save_dir / 'last.pt')
+        if top1 > best_top1:
+            best_top1 = top1
+            torch.save(ckpt, save_dir / 'best.pt')
     
-    print("\n✅ Training Complete!")
-    print(f"   Best model saved at: runs/classify/solar_fault_detection/weights/best.pt")
+    print("\n✅ Distillation Complete!")
+    print(f"   Best student saved at: {save_dir / 'best.pt'}")
     
-    return model, results
+    # Student vs teacher on the test split, scored at each model's own input size
+    report = compare_checkpoints([str(teacher_path), str(save_dir / 'best.pt')], imgsz=teacher_imgsz)
+    print("\n📊 Teacher vs Student (CPU):")
+    print(report[['checkpoint', 'imgsz', 'top1', 'top5', 'latency_ms']].to_string(index=False))
+    
+    if accuracy_floor is not None:
+        student_top1 = report.loc[report['checkpoint'] == str(save_dir / 'best.pt'), 'top1'].item()
+        verdict = "meets" if student_top1 >= accuracy_floor else "is below"
+        print(f"\n   Student top-1 {student_top1:.4f} {verdict} the {accuracy_floor:.4f} floor")
+    
+    return save_dir / 'best.pt', report
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the solar fault classifier")
+    parser.add_argument('--distill', action='store_true', help="Distill a teacher into a smaller student")
+    parser.add_argument('--teacher', default='best.pt', help="Teacher weights for --distill")
+    parser.add_argument('--width', type=float, default=0.125, help="Student width multiple")
+    parser.add_argument('--imgsz', type=int, default=160, help="Student input size")
+    parser.add_argument('--epochs', type=int, default=50, help="Student training epochs")
+    parser.add_argument('--floor', type=float, default=None, help="Student top-1 accuracy floor")
+    args = parser.parse_args()
+    
     print("="*70)
     print("SOLAR PANEL FAULT DETECTION - YOLOv8 TRAINING")
     print("="*70)
     
-    model, results = train_model()
-    
-    print("\n📊 Next Steps:")
-    print("   1. Run: python evaluate.py  - to evaluate on test set")
-    print("   2. Run: python predict.py   - to make predictions")
-    print("   3. Check: runs/classify/solar_fault_detection - for logs")
+    if args.distill:
+        distill_model(args.teacher, args.width, args.imgsz, epochs=args.epochs, accuracy_floor=args.floor)
+    else:
+        model, results = train_model()
+        
+        print("\n📊 Next Steps:")
+        print("   1. Run: python evaluate.py  - to evaluate on test set")
+        print("   2. Run: python predict.py   - to make predictions")
+        print("   3. Run: python hparam_search.py - to search for better hyperparameters")
+        print("   4. Check: runs/classify/solar_fault_detection - for logs")